@@ -0,0 +1,103 @@
+import sys
+import os
+import json
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.model import RiskModel
+from verify_native import make_data
+
+# Load cost of one model artifact in N concurrent worker processes, like
+# `uvicorn --workers N`. Memory comes from /proc/self/smaps_rollup (Linux):
+# PSS splits shared pages across the processes mapping them, so a
+# memory-mapped artifact shows up as ~1/N of its size per worker.
+
+FORMATS = ['.pkl', '.npz', '.trees']
+
+WORKER = """
+import sys, time, json
+sys.path.insert(0, {src_dir!r})
+import numpy as np
+from src.model import RiskModel
+
+def rollup():
+    fields = {{}}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+import joblib, lightgbm  # same imports in every run, outside the measurement
+
+before = rollup()
+start = time.perf_counter()
+model = RiskModel({path!r}, native=True)
+load_s = time.perf_counter() - start
+model.predict_proba(np.zeros((1, {n_features}), dtype=np.float32))
+# Fault in every page of the node arrays without allocating temporaries
+for value in vars(model.model).values():
+    if isinstance(value, np.ndarray):
+        value.sum()
+print('ready', flush=True)
+sys.stdin.readline()  # measure once every worker holds the model
+after = rollup()
+print(json.dumps({{
+    'load_ms': load_s * 1e3,
+    'rss_mb': (after['Rss'] - before['Rss']) / 1024,
+    'pss_mb': (after['Pss'] - before['Pss']) / 1024,
+}}), flush=True)
+"""
+
+def measure(path, n_features, workers):
+    script = WORKER.format(src_dir=os.path.abspath('bnpl_risk_platform'), path=path, n_features=n_features)
+    procs = [subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True) for _ in range(workers)]
+    for p in procs:
+        assert p.stdout.readline().strip() == 'ready'
+    results = []
+    for p in procs:
+        p.stdin.write('\n')
+        p.stdin.flush()
+        results.append(json.loads(p.stdout.readline()))
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+    return {k: sum(r[k] for r in results) / workers for k in results[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker load time and memory of model artifact formats")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--trees', type=int, default=1000)
+    parser.add_argument('--leaves', type=int, default=255)
+    parser.add_argument('--output', default='bench_results/artifacts.json')
+    args = parser.parse_args()
+
+    print(f"Training LightGBM with {args.trees} trees x {args.leaves} leaves...")
+    X, y = make_data(50_000)
+    model = RiskModel(model_type='lightgbm')
+    model.train(X, y, params={'objective': 'binary', 'verbosity': -1, 'n_estimators': args.trees,
+                              'num_leaves': args.leaves, 'min_child_samples': 5})
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in FORMATS:
+            path = os.path.join(tmp, 'model' + ext)
+            model.save(path)
+            r = measure(path, X.shape[1], args.workers)
+            r['file_mb'] = os.path.getsize(path) / 2**20
+            results[ext] = r
+            print(f"  {ext:>7}: file {r['file_mb']:.1f}MB, load {r['load_ms']:.1f}ms, "
+                  f"per worker RSS +{r['rss_mb']:.1f}MB / PSS +{r['pss_mb']:.1f}MB ({args.workers} workers)")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'workers': args.workers, 'trees': args.trees, 'leaves': args.leaves, 'results': results}, f, indent=2)
+    print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
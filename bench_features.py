@@ -0,0 +1,67 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.data_utils import clean_percent_col, parse_term_months
+from src.features import VALID_STATUS, BAD_INDICATORS
+
+# Row-wise versions that create_features / main_app.py used before vectorization
+
+def legacy_target(status):
+    return status.apply(lambda x: 1 if x in BAD_INDICATORS else 0)
+
+def legacy_term(term):
+    return term.str.extract('(\\d+)').astype(float)[0]
+
+def legacy_percent(col):
+    return col.str.strip(' %').astype(float)
+
+def vectorized_target(status):
+    return status.isin(BAD_INDICATORS).astype(int)
+
+CASES = [
+    ('target', 'loan_status', legacy_target, vectorized_target),
+    ('term', 'term', legacy_term, parse_term_months),
+    ('percent', 'int_rate', legacy_percent, clean_percent_col),
+]
+
+def make_raw_columns(n, seed=42):
+    rng = np.random.default_rng(seed)
+    # Rates on a 0.01 grid, like the real dump, so the column has realistic cardinality
+    rates = np.round(rng.uniform(5, 30, n), 2)
+    return pd.DataFrame({
+        'loan_status': rng.choice(VALID_STATUS, n),
+        'term': rng.choice([' 36 months', ' 60 months'], n),
+        'int_rate': pd.Series(rates).map('{:.2f}%'.format),
+    })
+
+def best_of(func, col, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(col)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Row-wise vs vectorized feature transforms")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 2_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'transform':>10} {'row-wise':>10} {'vectorized':>11} {'speedup':>8}")
+    for n in args.sizes:
+        df = make_raw_columns(n)
+        for name, col, legacy, vectorized in CASES:
+            t_old, old = best_of(legacy, df[col], args.repeat)
+            t_new, new = best_of(vectorized, df[col], args.repeat)
+            assert np.allclose(old.to_numpy(dtype=float), new.to_numpy(dtype=float), equal_nan=True), name
+            print(f"{n:>10} {name:>10} {t_old:>9.3f}s {t_new:>10.3f}s {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+sys.path.append(os.path.abspath('bnpl_risk_platform/app'))
+
+from src.model import RiskModel
+from src.features import create_features
+from src.data_utils import save_features
+from src import stats
+from verify_native import make_data, MODEL_TYPES
+from gen_data_temp import make_lendingclub_raw
+
+# Repeatable performance suite for the scoring path. Every case reports
+# per-call latency percentiles and throughput; results are written as JSON and
+# can be checked against a stored baseline.
+
+BATCH_SIZES = [1, 10, 100, 10_000]
+
+SAMPLE_REQUEST = {
+    "loan_amnt": 10000.0, "int_rate": 12.5, "installment": 300.0, "annual_inc": 75000.0,
+    "dti": 15.0, "fico_range_low": 720.0, "revol_util": 45.0, "total_acc": 25.0,
+    "open_acc": 12.0, "pub_rec": 0.0, "term_months": 36.0, "grade": "B",
+    "home_ownership": "MORTGAGE", "verification_status": "Verified", "purpose": "debt_consolidation"
+}
+
+def time_calls(func, min_time=0.2, max_calls=1000, min_calls=5):
+    func()  # warm-up
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_calls and (len(samples) < min_calls or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    samples = np.array(samples)
+    return {
+        'calls': len(samples),
+        'p50_ms': float(np.percentile(samples, 50) * 1e3),
+        'p95_ms': float(np.percentile(samples, 95) * 1e3),
+        'mean_ms': float(samples.mean() * 1e3),
+    }
+
+def bench_predict_proba(results):
+    X, y = make_data(20_000)
+    X_score = X.iloc[:max(BATCH_SIZES)]
+    for m_type in MODEL_TYPES:
+        model = RiskModel(model_type=m_type)
+        model.train(X, y)
+        modes = [('wrapper', model)]
+
+        native = RiskModel(model_type=m_type, native=True)
+        native.model, native.schema = model.model, model.schema
+        native.enable_native()
+        modes.append(('native', native))
+
+        if m_type != 'logreg':
+            compiled = RiskModel(model_type=m_type, native=True)
+            compiled.model, compiled.schema = model.compile(), model.schema
+            compiled.enable_native()
+            modes.append(('compiled', compiled))
+
+        for mode, m in modes:
+            for n in BATCH_SIZES:
+                batch = X_score.iloc[:n] if mode == 'wrapper' else X_score.iloc[:n].to_numpy(dtype=np.float32)
+                r = time_calls(lambda: m.predict_proba(batch), max_calls=200 if n >= 10_000 else 1000)
+                r['rows_per_s'] = n / (r['mean_ms'] / 1e3)
+                results[f'predict_proba/{m_type}/{mode}/{n}'] = r
+                print(f"  predict_proba {m_type:>8} {mode:>8} n={n:<6} p50 {r['p50_ms']:.3f}ms")
+
+def bench_api(results):
+    from fastapi.testclient import TestClient
+    import api
+
+    client = TestClient(api.app)
+    r = time_calls(lambda: client.post('/predict', json=SAMPLE_REQUEST))
+    results['api/predict'] = r
+    print(f"  /predict p50 {r['p50_ms']:.3f}ms")
+
+    for n in [100, 1000]:
+        payload = [SAMPLE_REQUEST] * n
+        r = time_calls(lambda: client.post('/predict/batch', json=payload), max_calls=100)
+        r['rows_per_s'] = n / (r['mean_ms'] / 1e3)
+        results[f'api/predict_batch/{n}'] = r
+        print(f"  /predict/batch n={n} p50 {r['p50_ms']:.3f}ms")
+
+def bench_features(results):
+    for n in [10_000, 100_000]:
+        raw = make_lendingclub_raw(n)
+        r = time_calls(lambda: create_features(raw), max_calls=20, min_calls=3)
+        r['rows_per_s'] = n / (r['mean_ms'] / 1e3)
+        results[f'create_features/{n}'] = r
+        print(f"  create_features n={n} p50 {r['p50_ms']:.1f}ms")
+    return create_features(make_lendingclub_raw(100_000))
+
+def bench_stats(results, processed):
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in ['.csv', '.parquet']:
+            path = os.path.join(tmp, 'features' + ext)
+            save_features(processed, path)
+
+            def cold():
+                stats._file_cache.clear()
+                stats.get_portfolio_stats(path, include_live=False)
+
+            results[f'portfolio_stats/cold{ext}'] = time_calls(cold, max_calls=20, min_calls=3)
+            results[f'portfolio_stats/cached{ext}'] = time_calls(lambda: stats.get_portfolio_stats(path, include_live=False))
+            print(f"  get_portfolio_stats {ext} cold p50 {results[f'portfolio_stats/cold{ext}']['p50_ms']:.2f}ms"
+                  f" cached p50 {results[f'portfolio_stats/cached{ext}']['p50_ms']:.3f}ms")
+
+def check_baseline(results, baseline, tolerance):
+    """Cases whose p50 regressed by more than `tolerance` (fractional) against the baseline."""
+    regressions = []
+    for case, base in baseline.items():
+        if case in results and results[case]['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+            regressions.append((case, base['p50_ms'], results[case]['p50_ms']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput/latency benchmark for the scoring path")
+    parser.add_argument('--output', default='bench_results/scoring.json')
+    parser.add_argument('--baseline', default='bench_results/scoring_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed p50 slowdown vs baseline (0.5 = 50%%)")
+    parser.add_argument('--only', nargs='+', choices=['predict_proba', 'api', 'features', 'stats'])
+    args = parser.parse_args()
+
+    sections = args.only or ['predict_proba', 'api', 'features', 'stats']
+    results = {}
+    if 'predict_proba' in sections:
+        print("RiskModel.predict_proba...")
+        bench_predict_proba(results)
+    if 'api' in sections:
+        print("API (in-process ASGI client)...")
+        bench_api(results)
+    if 'features' in sections or 'stats' in sections:
+        print("create_features...")
+        processed = bench_features(results)
+        if 'stats' in sections:
+            print("get_portfolio_stats...")
+            bench_stats(results, processed)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_baseline(results, baseline, args.tolerance)
+        for case, before, after in regressions:
+            print(f"REGRESSION {case}: p50 {before:.3f}ms -> {after:.3f}ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
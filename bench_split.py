@@ -0,0 +1,91 @@
+import sys
+import os
+import json
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.features import create_features, build_feature_schema
+from src.data_utils import FeatureStoreWriter
+from gen_data_temp import make_lendingclub_raw
+
+# Memory of training prep: the old drop / split / copy / re-attach / drop
+# sequence against load_training_split. Each variant runs in a fresh
+# interpreter with the heavy imports done first, so the RSS deltas are the
+# data alone. Peak is the kernel's high-water mark (Linux).
+
+PREP = """
+import sys, time, json
+sys.path.insert(0, {src_dir!r})
+import numpy as np, pandas as pd, pyarrow.parquet, sklearn.model_selection
+from src.data_utils import load_data, split_data, load_training_split, memory_report, rss_mb
+
+def hwm_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM'):
+                return int(line.split()[1]) / 1024
+
+base = rss_mb()
+open('/proc/self/clear_refs', 'w').write('5')  # reset the high-water mark to current RSS
+start = time.perf_counter()
+if {variant!r} == 'legacy':
+    target = 'is_default'
+    df = load_data({path!r})
+    X = df.drop(columns=[target])
+    y = df[target]
+    X[target] = y
+    X_train_full, X_test_full = split_data(X, target)
+    y_train = X_train_full[target]
+    X_train = X_train_full.drop(columns=[target])
+    y_test = X_test_full[target]
+    X_test = X_test_full.drop(columns=[target])
+else:
+    X_train, X_test, y_train, y_test = load_training_split({path!r})
+seconds = time.perf_counter() - start
+report = memory_report(X_train, X_test, y_train, y_test)
+print(json.dumps(dict(report, seconds=seconds, rss_mb=rss_mb() - base, peak_rss_mb=hwm_mb() - base)))
+"""
+
+def write_store(path, rows, chunk_rows=250_000, seed=42):
+    schema = build_feature_schema(make_lendingclub_raw(min(rows, 200_000), seed))
+    seqs = np.random.SeedSequence(seed).spawn(-(-rows // chunk_rows))
+    with FeatureStoreWriter(path) as writer:
+        for i, seq in enumerate(seqs):
+            n = min(chunk_rows, rows - i * chunk_rows)
+            writer.write(create_features(make_lendingclub_raw(n, seq), schema=schema))
+    return writer.rows
+
+def measure(variant, path):
+    script = PREP.format(src_dir=os.path.abspath('bnpl_risk_platform'), variant=variant, path=path)
+    proc = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of train/test prep: legacy split_data vs load_training_split")
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--output', default='bench_results/split.json')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'features.parquet')
+        print(f"Writing a {args.rows:,}-row feature store...")
+        write_store(path, args.rows)
+        results['file_mb'] = os.path.getsize(path) / 2**20
+        for variant in ['legacy', 'load_training_split']:
+            r = results[variant] = measure(variant, path)
+            data_mb = r['feature_mb'] + r['target_mb']
+            print(f"  {variant:>19}: {r['seconds']:.2f}s, data {data_mb:.0f}MB ({'/'.join(r['dtypes'])}), "
+                  f"RSS +{r['rss_mb']:.0f}MB, peak +{r['peak_rss_mb']:.0f}MB ({r['peak_rss_mb'] / data_mb:.2f}x data)")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
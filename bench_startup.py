@@ -0,0 +1,80 @@
+import sys
+import os
+import json
+import argparse
+import statistics
+import subprocess
+
+# Cold-start cost of the two entry points: each run is a fresh interpreter that
+# imports the app module, so it includes every library the import chain pulls in.
+APP_DIR = os.path.abspath('bnpl_risk_platform/app')
+
+TARGETS = {
+    'api': "import api",
+    # Streamlit executes the script body on import; outside `streamlit run` it
+    # runs in bare mode, which is enough to time the imports
+    'main_app': "import main_app",
+}
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+backends = [m for m in ('lightgbm', 'xgboost', 'catboost', 'sklearn', 'pandas', 'joblib') if m in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'modules': len(sys.modules), 'backends': backends}}))
+"""
+
+def measure(stmt, repeat):
+    samples, info = [], {}
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-c', PROBE.format(app_dir=APP_DIR, stmt=stmt)],
+            capture_output=True, text=True, cwd=APP_DIR
+        )
+        if proc.returncode != 0:
+            return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr else 'failed'}
+        info = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append(info['seconds'])
+    return {
+        'median_seconds': statistics.median(samples),
+        'min_seconds': min(samples),
+        'modules': info['modules'],
+        'backends': info['backends'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for api.py and main_app.py")
+    parser.add_argument('--label', default='after', help="Name for this run, e.g. before/after")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='bench_results/startup.json')
+    args = parser.parse_args()
+
+    results = {}
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            results = json.load(f)
+
+    run = {}
+    for name, stmt in TARGETS.items():
+        print(f"Timing {name}...")
+        run[name] = measure(stmt, args.repeat)
+        print(f"  {run[name]}")
+    results[args.label] = run
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved to {args.output}")
+
+    if 'before' in results and 'after' in results:
+        print("\n--- STARTUP (median seconds) ---")
+        for name in TARGETS:
+            before = results['before'][name].get('median_seconds')
+            after = results['after'][name].get('median_seconds')
+            if before and after:
+                print(f"{name:>10}: {before:.3f} -> {after:.3f} ({before / after:.1f}x)")
+
+if __name__ == "__main__":
+    main()
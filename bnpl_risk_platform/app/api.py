@@ -1,17 +1,42 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from typing import List
 import sys
 import os
-import pandas as pd
+import json
+import time
+import asyncio
+import logging
+import threading
+import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.model import RiskModel
-from src.inference import make_decision, get_recommended_limit, calculate_expected_profit
-from src.stats import get_portfolio_stats
+from src.inference import make_decision, get_recommended_limit, calculate_expected_profit, apply_policy_batch
+from src.stats import get_portfolio_stats, record_transactions
+from src.encoder import FeatureEncoder
+from src.metrics import MetricsRegistry, TimingMiddleware, request_start
+from src.serving import serving_config, make_executor, MicroBatcher, ModelSlot, ArtifactWatcher, load_model
+from src.policy import ScoredBook
+from src.cache import ScoreCache
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="BNPL Risk Engine API", version="1.0")
 
+metrics = MetricsRegistry()
+metrics.describe('request_seconds', "End-to-end request latency by route")
+metrics.describe('stage_seconds', "Latency of each scoring stage: parse, encode, predict (including micro-batch wait), policy")
+metrics.describe('decisions_total', "Scored applications by decision")
+metrics.describe('model_errors_total', "Failed predict_proba calls")
+metrics.describe('microbatch_batches_total', "predict_proba calls made by the /predict micro-batcher")
+metrics.describe('microbatch_rows_total', "Rows scored by the /predict micro-batcher")
+metrics.describe('model_reloads_total', "Model reload attempts by result")
+metrics.describe('model_version', "Reload counter of the model currently serving")
+metrics.describe('score_cache_requests_total', "/predict score cache lookups by result")
+metrics.describe('score_cache_entries', "Scores currently cached")
+
 # Enable CORS for React Frontend (default Vite port 5173 and fallback 5174)
 origins = [
     "http://localhost:5173",
@@ -28,8 +53,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request time includes CORS handling and body parsing
+app.add_middleware(
+    TimingMiddleware, registry=metrics,
+    paths=["/", "/stats", "/settings", "/predict", "/predict/batch", "/metrics", "/admin/model", "/admin/reload", "/simulate"]
+)
+
 model_path = os.path.join(os.path.dirname(__file__), '../models/champion_model.pkl')
-model = RiskModel(model_path)
+
+# Sized by BNPL_INFERENCE_WORKERS / BNPL_MODEL_THREADS (see src.serving)
+config = serving_config()
+executor = make_executor(config['workers'])
+
+# Concurrent /predict calls share one predict_proba call per few milliseconds
+batcher = MicroBatcher(
+    executor, max_batch_size=config['max_batch_size'], max_wait_ms=config['max_wait_ms'],
+    max_inflight=config['workers'], metrics=metrics
+)
+metrics.set_gauge('microbatch_pending', lambda: batcher.pending)
+
+# Merchant retries re-send identical applications; their scores are reused
+# until the TTL runs out or a new model is swapped in (keyed by slot version)
+score_cache = ScoreCache(config['score_cache_size'], config['score_cache_ttl'])
+metrics.set_gauge('score_cache_entries', lambda: len(score_cache))
+
+WARMUP_REQUEST = {
+    "loan_amnt": 10000.0, "int_rate": 12.5, "installment": 300.0, "annual_inc": 75000.0,
+    "dti": 15.0, "fico_range_low": 720.0, "revol_util": 45.0, "total_acc": 25.0,
+    "open_acc": 12.0, "pub_rec": 0.0, "term_months": 36.0, "grade": "B",
+    "home_ownership": "MORTGAGE", "verification_status": "Verified", "purpose": "debt_consolidation"
+}
+
+def _load_model(path):
+    # Compiled trees for single rows and micro-batches, the native booster for
+    # larger batches (BNPL_COMPILED_MAX_ROWS, see src.serving)
+    model = load_model(path, config['model_threads'], config['compiled_max_rows'])
+    # Resolved once from the model's feature order; shared by /predict and /predict/batch
+    return model, FeatureEncoder.from_model(model)
+
+def _warm_up(model, encoder):
+    # Single-row and batch paths, so the first real requests do not pay for lazy init
+    X = encoder.encode_batch([WARMUP_REQUEST] * config['max_batch_size'])
+    for rows in (X[:1], X):
+        probs = model.predict_proba(rows)
+        if not np.all(np.isfinite(probs) & (probs >= 0) & (probs <= 1)):
+            raise ValueError("Warm-up predictions are not probabilities")
+
+slot = ModelSlot(_load_model, _warm_up)
+slot.reload(model_path)
+metrics.set_gauge('model_version', lambda: slot.current.version)
+
+def reload_model():
+    try:
+        loaded = slot.reload(model_path)
+    except Exception:
+        metrics.inc('model_reloads_total', result='failed')
+        raise
+    metrics.inc('model_reloads_total', result='ok')
+    logger.info("Serving model %s (version %d)", loaded.path, loaded.version)
+    return loaded
+
+# Optional: pick up a new champion written by run_benchmark.py without an admin call
+if float(os.environ.get('BNPL_MODEL_WATCH_SECONDS', 0)) > 0:
+    watcher = ArtifactWatcher(model_path, reload_model, interval=float(os.environ['BNPL_MODEL_WATCH_SECONDS']))
+    watcher.start()
 
 settings = {
     'threshold': 0.15,
@@ -37,6 +124,12 @@ settings = {
     'max_dti': 40
 }
 
+# EMV-optimal settings written by optimize_policy.py, if it has been run
+policy_path = os.path.join(os.path.dirname(__file__), '../models/policy_settings.json')
+if os.path.exists(policy_path):
+    with open(policy_path) as f:
+        settings.update(json.load(f))
+
 class TransactionRequest(BaseModel):
     loan_amnt: float
     int_rate: float
@@ -67,7 +160,26 @@ class TransactionRequest(BaseModel):
 
 @app.get("/")
 def health_check():
-    return {"status": "active", "model_loaded": model.model is not None}
+    return {"status": "active", "model_loaded": slot.current is not None}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/model")
+def get_model_info():
+    return dict(slot.current.info(), score_cache=score_cache.stats())
+
+@app.post("/admin/reload")
+async def reload():
+    # Always the configured champion path: loading arbitrary files would mean unpickling them.
+    # Runs off the event loop; requests keep hitting the current model until the swap.
+    try:
+        loaded = await asyncio.to_thread(reload_model)
+    except Exception as e:
+        logger.exception("Model reload failed; keeping the current model")
+        raise HTTPException(status_code=500, detail=f"Reload failed: {str(e)}")
+    return loaded.info()
 
 @app.get("/stats")
 def get_stats():
@@ -89,64 +201,98 @@ def update_settings(new_settings: dict):
         settings['max_dti'] = int(new_settings['max_dti'])
     return settings
 
-@app.post("/predict")
-def predict(request: TransactionRequest):
-    # Manual Feature Mapping for Real Data Schema
-    # This must match src.features.create_features logic
-    
-    # 1. Start with numeric inputs
-    # loan_amnt, int_rate, installment, annual_inc, dti, fico_range_low, revol_util, total_acc, open_acc, pub_rec, term_months
-    
-    # Create a dict with all model features initialized to 0
-    # We need the list of features the model expects. 
-    # Ideally we load this from a saved artifact, but for now we hardcode based on training knowledge.
-    
-    # Base numeric features
-    features = {
-        'loan_amnt': request.loan_amnt,
-        'int_rate': request.int_rate,
-        'installment': request.installment,
-        'annual_inc': request.annual_inc,
-        'dti': request.dti,
-        'fico_range_low': request.fico_range_low,
-        'revol_util': request.revol_util,
-        'total_acc': request.total_acc,
-        'open_acc': request.open_acc,
-        'pub_rec': request.pub_rec,
-        'term_months': request.term_months
+# Historical book with the serving model's probabilities, scored on first use
+# and again only after a model swap; /simulate never calls the model itself
+_book = {'version': None, 'book': None, 'source': None}
+_book_lock = threading.Lock()
+
+def _scored_book():
+    current = slot.current
+    with _book_lock:
+        if _book['version'] != current.version:
+            # pandas only when an analyst actually asks for a simulation
+            from src.data_utils import load_data, find_features_file
+            path = find_features_file(os.path.join(os.path.dirname(__file__), '..'))
+            book = ScoredBook.from_frame(load_data(path), current.model)
+            _book.update(version=current.version, book=book, source=os.path.abspath(path))
+        return _book['book'], _book['version'], _book['source']
+
+def _simulate(proposed):
+    book, version, source = _scored_book()
+    return {
+        'current': book.simulate(settings['threshold'], settings['min_fico'], settings['max_dti']),
+        'proposed': book.simulate(proposed['threshold'], proposed['min_fico'], proposed['max_dti']),
+        'book': {'rows': len(book), 'model_version': version, 'source': source},
     }
-    
-    # One-Hot Encoding Logic
-    # We need to know all possible categories from training to ensure columns exist
-    # Mapping request fields to 'grade_A', 'grade_B', etc.
-    
-    # Valid categories observed in training (Lending Club typicals)
-    grades = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
-    home_ownerships = ['RENT', 'MORTGAGE', 'OWN', 'OTHER', 'NONE', 'ANY']
-    verification_statuses = ['Verified', 'Source Verified', 'Not Verified']
-    purposes = ['debt_consolidation', 'credit_card', 'home_improvement', 'other', 'major_purchase', 'medical', 'small_business', 'car', 'vacation', 'moving', 'house', 'wedding', 'renewable_energy', 'educational']
-
-    # Set all categorical columns to 0
-    for g in grades: features[f'grade_{g}'] = 0
-    for h in home_ownerships: features[f'home_ownership_{h}'] = 0
-    for v in verification_statuses: features[f'verification_status_{v}'] = 0
-    for p in purposes: features[f'purpose_{p}'] = 0
-
-    # Set active category to 1
-    if f'grade_{request.grade}' in features: features[f'grade_{request.grade}'] = 1
-    if f'home_ownership_{request.home_ownership}' in features: features[f'home_ownership_{request.home_ownership}'] = 1
-    if f'verification_status_{request.verification_status}' in features: features[f'verification_status_{request.verification_status}'] = 1
-    if f'purpose_{request.purpose}' in features: features[f'purpose_{request.purpose}'] = 1
-
-    # Create DataFrame with correct column order
-    # (LightGBM is somewhat robust to column order if using dataframe, but strict on names)
-    data = pd.DataFrame([features])
-    
+
+@app.post("/simulate")
+async def simulate(proposed_settings: dict):
+    # Same fields as POST /settings; anything omitted keeps its live value
+    proposed = dict(settings)
     try:
-        prob = model.predict_proba(data)[0]
-    except Exception as e:
-        print(f"Prediction failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Model error: {str(e)}")
+        if 'threshold' in proposed_settings:
+            proposed['threshold'] = float(proposed_settings['threshold'])
+        if 'min_fico' in proposed_settings:
+            proposed['min_fico'] = int(proposed_settings['min_fico'])
+        if 'max_dti' in proposed_settings:
+            proposed['max_dti'] = int(proposed_settings['max_dti'])
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid settings: {str(e)}")
+    try:
+        result = await asyncio.to_thread(_simulate, proposed)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=f"No processed portfolio to simulate on: {str(e)}")
+    except (KeyError, ValueError) as e:
+        # The store does not fit the serving model (columns, schema); nothing the caller can fix
+        logger.exception("Simulation failed")
+        raise HTTPException(status_code=503, detail=f"Cannot score the processed portfolio: {str(e)}")
+    result['settings'] = proposed
+    return result
+
+def _stage_clock(endpoint):
+    """Records time since the request arrived as the parse stage and returns a stage timer."""
+    now = time.perf_counter()
+    start = request_start.get()
+    if start is not None:
+        metrics.observe('stage_seconds', now - start, endpoint=endpoint, stage='parse')
+    last = [now]
+
+    def lap(stage):
+        t = time.perf_counter()
+        metrics.observe('stage_seconds', t - last[0], endpoint=endpoint, stage=stage)
+        last[0] = t
+    return lap
+
+async def _score_row(model, row):
+    if config['microbatch']:
+        return await batcher.submit(row, model.predict_proba)
+    loop = asyncio.get_running_loop()
+    return (await loop.run_in_executor(executor, model.predict_proba, row[np.newaxis, :]))[0]
+
+@app.post("/predict")
+async def predict(request: TransactionRequest):
+    lap = _stage_clock('predict')
+    # One model for the whole request, even if a reload swaps it meanwhile
+    current = slot.current
+
+    # One float32 row in the model's column order
+    row = current.encoder.encode(request)
+    lap('encode')
+
+    # Only the score is cached; the decision below always uses the live settings
+    prob = score_cache.get(row, current.version)
+    cached = prob is not None
+    if score_cache.enabled:
+        metrics.inc('score_cache_requests_total', result='hit' if cached else 'miss')
+    if not cached:
+        try:
+            prob = await _score_row(current.model, row)
+        except Exception as e:
+            metrics.inc('model_errors_total', endpoint='predict')
+            logger.exception("Prediction failed")
+            raise HTTPException(status_code=500, detail=f"Model error: {str(e)}")
+        score_cache.put(row, current.version, prob)
+    lap('predict')
         
     decision = make_decision(
         prob, 
@@ -163,6 +309,13 @@ def predict(request: TransactionRequest):
     
     limit = get_recommended_limit(final_prob) if decision == 'APPROVE' else 0
     profit = calculate_expected_profit(final_prob, request.loan_amnt)
+
+    # Approved applications go into the live book /stats reports next to the realized
+    # totals; a cache hit is a retry of an application already counted
+    if not cached and decision == 'APPROVE':
+        record_transactions(request.loan_amnt, prob, request.fico_range_low)
+    lap('policy')
+    metrics.inc('decisions_total', endpoint='predict', decision=decision)
     
     return {
         "probability_of_default": final_prob,
@@ -170,3 +323,57 @@ def predict(request: TransactionRequest):
         "recommended_limit": limit,
         "expected_profit": float(profit)
     }
+
+
+@app.post("/predict/batch")
+async def predict_batch(requests: List[TransactionRequest]):
+    lap = _stage_clock('predict_batch')
+    if not requests:
+        return []
+
+    current = slot.current
+    X = current.encoder.encode_batch(requests)
+    lap('encode')
+
+    try:
+        # Already a batch: straight to the executor, keeping the event loop free
+        probs = await asyncio.get_running_loop().run_in_executor(executor, current.model.predict_proba, X)
+    except Exception as e:
+        metrics.inc('model_errors_total', endpoint='predict_batch')
+        logger.exception("Batch prediction failed")
+        raise HTTPException(status_code=500, detail=f"Model error: {str(e)}")
+    lap('predict')
+
+    amounts = np.array([r.loan_amnt for r in requests], dtype=float)
+    fico = np.array([r.fico_range_low for r in requests], dtype=float)
+    dti = np.array([r.dti for r in requests], dtype=float)
+
+    # Same rules and overrides as /predict, for all rows at once
+    policy = apply_policy_batch(
+        probs,
+        amounts,
+        threshold=settings['threshold'],
+        fico_score=fico,
+        dti=dti,
+        min_fico=settings['min_fico'],
+        max_dti=settings['max_dti']
+    )
+    approved = policy['approved']
+    record_transactions(amounts, probs, fico, approved=approved)
+    lap('policy')
+
+    n_approved = int(approved.sum())
+    metrics.inc('decisions_total', n_approved, endpoint='predict_batch', decision='APPROVE')
+    metrics.inc('decisions_total', len(requests) - n_approved, endpoint='predict_batch', decision='REJECT')
+
+    return [
+        {
+            "probability_of_default": float(p),
+            "decision": "APPROVE" if a else "REJECT",
+            "recommended_limit": int(l),
+            "expected_profit": float(pr)
+        }
+        for p, a, l, pr in zip(
+            policy['probability_of_default'], approved, policy['recommended_limit'], policy['expected_profit']
+        )
+    ]
@@ -1,10 +1,7 @@
 import streamlit as st
-import pandas as pd
-import requests
+import numpy as np
 import os
 import sys
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # Ensure we are in the correct root directory regardless of how Streamlit runs this
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,7 +12,9 @@ if not os.path.exists(os.path.join(BASE_DIR, 'src')):
 
 sys.path.append(BASE_DIR)
 
-from src.data_utils import load_data
+from src.data_utils import load_data, available_columns
+from src.encoder import CATEGORIES, FeatureEncoder
+from src.features import BAD_INDICATORS
 
 st.set_page_config(page_title="BNPL Risk Dashboard", layout="wide")
 
@@ -24,24 +23,26 @@ st.title("💳 BNPL Risk & Profit Optimization Platform")
 mode = st.sidebar.selectbox("Mode", ["Admin Dashboard", "Transaction Simulator"])
 
 if mode == "Admin Dashboard":
+    # Plotting libraries are only needed on this page
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     st.header("Portfolio Overview")
     
     # Load sample data efficiently
     try:
         data_path = os.path.join(BASE_DIR, 'data/raw/LendingClub_data.csv')
-        df = load_data(data_path)
-        
-        # Calculate default rate
-        bad_indicators = ['Charged Off', 'Default', 'Does not meet the credit policy. Status:Charged Off']
-        if 'loan_status' in df.columns:
-            is_default = df['loan_status'].apply(lambda x: 1 if x in bad_indicators else 0)
-        else:
-            is_default = pd.Series([0]) # Fallback
+        # Only the columns this page uses (and the file has), not all 150+ of the raw dump
+        available = set(available_columns(data_path))
+        df = load_data(data_path, columns=[c for c in ['loan_status', 'loan_amnt', 'dti'] if c in available])
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Total Transactions", len(df))
-        col2.metric("Default Rate", f"{is_default.mean():.2%}")
-        col3.metric("Total Volume", f"${df['loan_amnt'].sum():,.0f}")
+        if 'loan_status' in df.columns:
+            col2.metric("Default Rate", f"{df['loan_status'].isin(BAD_INDICATORS).mean():.2%}")
+        else:
+            col2.metric("Default Rate", "n/a")
+        col3.metric("Total Volume", f"${df['loan_amnt'].sum():,.0f}" if 'loan_amnt' in df.columns else "n/a")
         
         st.subheader("Risk Distribution (Debt-to-Income)")
         fig, ax = plt.subplots(figsize=(10, 4))
@@ -66,13 +67,9 @@ elif mode == "Transaction Simulator":
             int_rate = st.number_input("Interest Rate (%)", 5.0, 30.0, 12.0)
             
         with col2:
-            grade = st.selectbox("Grade", ['A', 'B', 'C', 'D', 'E', 'F', 'G'])
+            grade = st.selectbox("Grade", CATEGORIES['grade'])
             term = st.selectbox("Term", ["36 months", "60 months"])
-            purpose = st.selectbox("Purpose", [
-                'debt_consolidation', 'credit_card', 'home_improvement', 'other', 
-                'major_purchase', 'medical', 'small_business', 'car', 'vacation', 
-                'moving', 'house', 'wedding', 'renewable_energy', 'educational'
-            ])
+            purpose = st.selectbox("Purpose", CATEGORIES['purpose'])
             home = st.selectbox("Home Ownership", ['RENT', 'MORTGAGE', 'OWN'])
             
         submitted = st.form_submit_button("Assess Risk")
@@ -83,39 +80,27 @@ elif mode == "Transaction Simulator":
             
             # Use local inference
             try:
-                from src.model import RiskModel # Lazy load
+                from src.serving import load_model # Lazy load
                 from src.inference import make_decision, get_recommended_limit, calculate_expected_profit
                 
-                model_path = os.path.join(BASE_DIR, 'models/lightgbm_model.pkl')
-                model = RiskModel(model_path)
+                # Same artifacts and scoring path as the API: a float32 row through the compiled trees
+                model_path = os.path.join(BASE_DIR, 'models/champion_model.pkl')
+                model = load_model(model_path)
                 
-                # Mock request object logic from API
-                features = {
+                # Same encoder as the API, so the one-hot layout cannot drift
+                encoder = FeatureEncoder.from_model(model)
+                row = encoder.encode({
                     'loan_amnt': loan_amnt, 'int_rate': int_rate, 'installment': loan_amnt/term_months, # Approx
                     'annual_inc': annual_inc, 'dti': dti, 'fico_range_low': fico,
                     'revol_util': 50.0, 'total_acc': 20.0, 'open_acc': 10.0, 'pub_rec': 0.0,
-                    'term_months': term_months
-                }
-                
-                # Zero out cats
-                grades = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
-                home_ownerships = ['RENT', 'MORTGAGE', 'OWN', 'OTHER', 'NONE', 'ANY']
-                verification_statuses = ['Verified', 'Source Verified', 'Not Verified']
-                purposes = ['debt_consolidation', 'credit_card', 'home_improvement', 'other', 'major_purchase', 'medical', 'small_business', 'car', 'vacation', 'moving', 'house', 'wedding', 'renewable_energy', 'educational']
-
-                for g in grades: features[f'grade_{g}'] = 0
-                for h in home_ownerships: features[f'home_ownership_{h}'] = 0
-                for v in verification_statuses: features[f'verification_status_{v}'] = 0
-                for p in purposes: features[f'purpose_{p}'] = 0
-
-                # Set active
-                if f'grade_{grade}' in features: features[f'grade_{grade}'] = 1
-                if f'home_ownership_{home}' in features: features[f'home_ownership_{home}'] = 1
-                features[f'verification_status_Source Verified'] = 1 # Default assumption
-                if f'purpose_{purpose}' in features: features[f'purpose_{purpose}'] = 1
+                    'term_months': term_months,
+                    'grade': grade, 'home_ownership': home,
+                    'verification_status': 'Source Verified', # Default assumption
+                    'purpose': purpose
+                })
                 
                 # Predict
-                prob = model.predict_proba(pd.DataFrame([features]))[0]
+                prob = model.predict_proba(row[np.newaxis, :])[0]
                 
                 decision = make_decision(prob, loan_amnt)
                 limit = get_recommended_limit(prob)
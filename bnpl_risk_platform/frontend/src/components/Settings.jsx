@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { Save, RefreshCw, Shield, Sliders } from 'lucide-react';
+import { Save, RefreshCw, Shield, Sliders, TrendingUp } from 'lucide-react';
 import axios from 'axios';
 
 const Settings = () => {
@@ -8,6 +8,7 @@ const Settings = () => {
     const [maxDti, setMaxDti] = useState(40);
     const [saved, setSaved] = useState(false);
     const [loading, setLoading] = useState(true);
+    const [impact, setImpact] = useState(null);
 
     useEffect(() => {
         const fetchSettings = async () => {
@@ -32,6 +33,35 @@ const Settings = () => {
         fetchSettings();
     }, []);
 
+    // Price the slider values against the scored historical book before saving
+    useEffect(() => {
+        if (loading) return;
+        const timer = setTimeout(async () => {
+            try {
+                const response = await axios.post('http://127.0.0.1:8000/simulate', {
+                    threshold,
+                    min_fico: minFico,
+                    max_dti: maxDti
+                });
+                setImpact(response.data);
+            } catch (err) {
+                console.error('Failed to simulate settings:', err);
+                setImpact(null);
+            }
+        }, 150);
+        return () => clearTimeout(timer);
+    }, [threshold, minFico, maxDti, loading]);
+
+    const formatMoney = (value) =>
+        `${value < 0 ? '-' : ''}$${Math.abs(value).toLocaleString(undefined, { maximumFractionDigits: 0 })}`;
+
+    const impactRows = impact ? [
+        { label: 'Approval Rate', key: 'approval_rate', format: (v) => `${(v * 100).toFixed(1)}%` },
+        { label: 'Approved Volume', key: 'volume', format: formatMoney },
+        { label: 'Expected Loss', key: 'expected_loss', format: formatMoney },
+        { label: 'Expected Profit (EMV)', key: 'emv', format: formatMoney },
+    ] : [];
+
     const handleSave = async () => {
         setSaved(true);
         try {
@@ -151,6 +181,34 @@ const Settings = () => {
                 </div>
             </div>
 
+            {impact && (
+                <div className="glass-panel p-8">
+                    <div className="flex items-center gap-3 mb-6">
+                        <TrendingUp className="text-[#c3fb5c]" size={28} />
+                        <h2 className="text-2xl font-bold">Portfolio Impact</h2>
+                    </div>
+                    <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
+                        {impactRows.map(({ label, key, format }) => {
+                            const proposed = impact.proposed[key];
+                            const current = impact.current[key];
+                            const delta = proposed - current;
+                            return (
+                                <div key={key} className="bg-[#1a1d1f] rounded-2xl p-4 border border-[#272b30]">
+                                    <p className="text-xs font-bold text-[#6f767e] uppercase tracking-wide mb-2">{label}</p>
+                                    <p className="text-xl font-bold">{format(proposed)}</p>
+                                    <p className={`text-xs mt-1 ${delta === 0 ? 'text-[#6f767e]' : (delta > 0) === (key !== 'expected_loss') ? 'text-[#c3fb5c]' : 'text-red-400'}`}>
+                                        {delta >= 0 ? '+' : ''}{key === 'approval_rate' ? `${(delta * 100).toFixed(1)} pts` : format(delta)} vs live
+                                    </p>
+                                </div>
+                            );
+                        })}
+                    </div>
+                    <p className="text-xs text-[#6f767e] mt-4">
+                        Simulated on {impact.book.rows.toLocaleString()} historical loans scored by the current model
+                    </p>
+                </div>
+            )}
+
             <div className="flex gap-4">
                 <button
                     onClick={handleSave}
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Roughly what one entry costs in CPython: 16-byte digest key, (prob, expiry)
+# tuple of floats, and its OrderedDict slot
+ENTRY_BYTES = 240
+
+
+class ScoreCache:
+    """
+    LRU map with a TTL from an encoded feature row to the model's probability.
+    Only scores are cached, never decisions, so policy settings can change
+    without a flush. Entries belong to one model version; the first lookup
+    with a different version empties the cache.
+    """
+
+    def __init__(self, max_entries=100_000, ttl_seconds=30.0, clock=time.monotonic):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.clock = clock
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(row):
+        # Canonical bytes: float32, C order, -0.0 folded into 0.0, one NaN pattern
+        row = np.ascontiguousarray(row, dtype=np.float32) + np.float32(0.0)
+        if np.isnan(row).any():
+            row = np.where(np.isnan(row), np.float32(np.nan), row)
+        return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, row, version):
+        """Cached probability for this row under this model version, or None."""
+        if not self.enabled:
+            return None
+        key = self.key(row)
+        now = self.clock()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, row, version, prob):
+        if not self.enabled:
+            return
+        key = self.key(row)
+        expires = self.clock() + self.ttl
+        with self._lock:
+            # A score from a model that was swapped out meanwhile is dropped
+            if version != self.version:
+                return
+            self._entries[key] = (float(prob), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries), 'max_entries': self.max_entries, 'ttl_seconds': self.ttl,
+            'approx_bytes': len(self._entries) * ENTRY_BYTES,
+            'hits': self.hits, 'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
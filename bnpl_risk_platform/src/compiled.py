@@ -0,0 +1,342 @@
+import json
+import os
+import tempfile
+import numpy as np
+
+# NumPy-only representation of a fitted tree ensemble. Every tree is stored in
+# shared flat node arrays; leaves point back to themselves, so walking all trees
+# for max_depth steps lands every (row, tree) pair on its leaf.
+
+# Flat single-file layout that load_flat can memory-map (see save_flat)
+FLAT_EXT = '.trees'
+_FLAT_MAGIC = b'BNPLTREE'
+_FLAT_ALIGN = 64
+_NODE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'nan_left', 'value', 'roots')
+
+
+class CompiledEnsemble:
+    def __init__(self, feature, threshold, left, right, nan_left, value, roots,
+                 max_depth, base_score=0.0, scale=1.0, link='sigmoid', strict=False,
+                 float32_inputs=True, feature_names=None, column=None, children=None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.nan_left = np.asarray(nan_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.base_score = float(base_score)
+        self.scale = float(scale)
+        self.link = link
+        # XGBoost goes left on x < threshold, everything else on x <= threshold
+        self.strict = bool(strict)
+        # Libraries that compare in float32 (XGBoost, CatBoost, sklearn trees)
+        self.float32_inputs = bool(float32_inputs)
+        self.feature_names_in_ = list(feature_names) if feature_names is not None else None
+        self.classes_ = np.array([0, 1])
+        # Walk tables; precomputed in flat artifacts so a mapped load allocates nothing.
+        # Leaves have feature -1; any valid column works since both children are the leaf
+        self._column = np.maximum(self.feature, 0) if column is None else np.asarray(column, dtype=np.int32)
+        if children is None:
+            # Interleaved: children[2 * node] is the left child, children[2 * node + 1] the right
+            children = np.empty(2 * len(self.left), dtype=np.int32)
+            children[0::2], children[1::2] = self.left, self.right
+        self._children = np.asarray(children, dtype=np.int32)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_margin(self, X, chunk_size=4096):
+        X = np.asarray(X, dtype=np.float32 if self.float32_inputs else np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        out = np.empty(X.shape[0], dtype=np.float64)
+        # Chunked so the (rows x trees) node matrix stays small
+        for start in range(0, X.shape[0], chunk_size):
+            out[start:start + chunk_size] = self._margin(X[start:start + chunk_size].astype(np.float64))
+        return out
+
+    def _margin(self, X):
+        n, n_features = X.shape
+        flat = X.ravel()
+        # Row offsets into the flattened chunk: one 1-D gather per level
+        base = (np.arange(n, dtype=np.intp) * n_features)[:, np.newaxis]
+        node = np.repeat(self.roots[np.newaxis, :], n, axis=0)
+        has_nan = bool(np.isnan(flat).any())
+
+        for _ in range(self.max_depth):
+            x = flat[base + self._column[node]]
+            thr = self.threshold[node]
+            go_right = x >= thr if self.strict else x > thr
+            if has_nan:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.nan_left[node[missing]]
+            node = self._children[2 * node + go_right]
+
+        return self.value[node].sum(axis=1) * self.scale + self.base_score
+
+    def predict_proba(self, X):
+        # Same two-column layout as the sklearn-style wrappers
+        margin = self.predict_margin(X)
+        p = 1.0 / (1.0 + np.exp(-margin)) if self.link == 'sigmoid' else margin
+        return np.column_stack([1.0 - p, p])
+
+    def _meta(self):
+        return {
+            'max_depth': self.max_depth, 'base_score': self.base_score, 'scale': self.scale,
+            'link': self.link, 'strict': self.strict, 'float32_inputs': self.float32_inputs,
+            'feature_names': self.feature_names_in_
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        meta = self._meta()
+        np.savez(
+            path, feature=self.feature, threshold=self.threshold, left=self.left,
+            right=self.right, nan_left=self.nan_left, value=self.value, roots=self.roots,
+            meta=np.array(json.dumps(meta))
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {k: data[k] for k in ('feature', 'threshold', 'left', 'right', 'nan_left', 'value', 'roots')}
+        return cls(**arrays, **meta)
+
+    def save_flat(self, path):
+        """
+        Single file: magic, header length, JSON header (meta plus dtype/shape/offset
+        of each array), then the raw arrays on 64-byte boundaries. Written to a
+        temp file and renamed, so processes that have the old file mapped keep
+        reading the old inode instead of a half-written one.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {k: np.ascontiguousarray(getattr(self, k)) for k in _NODE_ARRAYS}
+        arrays['column'] = np.ascontiguousarray(self._column)
+        arrays['children'] = np.ascontiguousarray(self._children)
+
+        specs, offset = {}, 0
+        for name, arr in arrays.items():
+            specs[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+            offset += -(-arr.nbytes // _FLAT_ALIGN) * _FLAT_ALIGN
+        header = json.dumps({'meta': self._meta(), 'arrays': specs}).encode()
+        data_start = -(-(len(_FLAT_MAGIC) + 8 + len(header)) // _FLAT_ALIGN) * _FLAT_ALIGN
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_FLAT_MAGIC + len(header).to_bytes(8, 'little') + header)
+                for name, arr in arrays.items():
+                    f.seek(data_start + specs[name]['offset'])
+                    f.write(arr.tobytes())
+                f.truncate(data_start + offset)
+            # mkstemp creates 0600; give the file normal umask permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load_flat(cls, path, mmap=True):
+        """
+        Load a save_flat artifact. With mmap the node arrays are read-only views
+        of the page cache, so every worker process on a host shares one copy and
+        loading costs a header parse.
+        """
+        if mmap:
+            buf = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            buf = np.fromfile(path, dtype=np.uint8)
+        if bytes(buf[:len(_FLAT_MAGIC)]) != _FLAT_MAGIC:
+            raise ValueError(f"{path} is not a compiled tree artifact")
+        header_len = int.from_bytes(bytes(buf[len(_FLAT_MAGIC):len(_FLAT_MAGIC) + 8]), 'little')
+        header_end = len(_FLAT_MAGIC) + 8 + header_len
+        header = json.loads(bytes(buf[len(_FLAT_MAGIC) + 8:header_end]))
+        data_start = -(-header_end // _FLAT_ALIGN) * _FLAT_ALIGN
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = data_start + spec['offset']
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            arrays[name] = buf[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+        return cls(**arrays, **header['meta'])
+
+
+class _TreeBuilder:
+    """Accumulates nodes of several trees into shared flat arrays."""
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.nan_left, self.value, self.roots = [], [], []
+        self.max_depth = 0
+
+    def add_node(self):
+        self.feature.append(-1)
+        self.threshold.append(0.0)
+        self.left.append(len(self.left))
+        self.right.append(len(self.right))
+        self.nan_left.append(True)
+        self.value.append(0.0)
+        return len(self.feature) - 1
+
+    def set_split(self, node, feature, threshold, left, right, nan_left):
+        self.feature[node] = feature
+        self.threshold[node] = threshold
+        self.left[node] = left
+        self.right[node] = right
+        self.nan_left[node] = nan_left
+
+    def set_leaf(self, node, value):
+        self.value[node] = value
+
+    def build(self, **kwargs):
+        return CompiledEnsemble(
+            self.feature, self.threshold, self.left, self.right, self.nan_left,
+            self.value, self.roots, self.max_depth, **kwargs
+        )
+
+
+def _compile_lightgbm(est, feature_names):
+    dump = est.booster_.dump_model()
+    if not dump['objective'].startswith('binary'):
+        raise ValueError(f"Unsupported LightGBM objective: {dump['objective']}")
+    sigmoid = float(dump['objective'].split('sigmoid:')[1]) if 'sigmoid:' in dump['objective'] else 1.0
+    b = _TreeBuilder()
+
+    def walk(tree, depth):
+        node = b.add_node()
+        b.max_depth = max(b.max_depth, depth)
+        if 'leaf_value' in tree:
+            b.set_leaf(node, tree['leaf_value'])
+            return node
+        if tree['decision_type'] != '<=' or tree['missing_type'] == 'Zero':
+            raise ValueError("Categorical and zero-as-missing splits are not supported")
+        left = walk(tree['left_child'], depth + 1)
+        right = walk(tree['right_child'], depth + 1)
+        # Without a missing type LightGBM treats NaN as 0
+        nan_left = tree['default_left'] if tree['missing_type'] == 'NaN' else 0.0 <= tree['threshold']
+        b.set_split(node, tree['split_feature'], tree['threshold'], left, right, nan_left)
+        return node
+
+    for info in dump['tree_info']:
+        b.roots.append(walk(info['tree_structure'], 0))
+    return b.build(scale=sigmoid, float32_inputs=False, feature_names=feature_names)
+
+
+def _compile_xgboost(est, feature_names):
+    booster = est.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective: {learner['objective']['name']}")
+
+    base = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    trees = learner['gradient_booster']['model']['trees']
+    best = getattr(est, 'best_iteration', None)
+    if best is not None:
+        trees = trees[:best + 1]
+    b = _TreeBuilder()
+
+    for tree in trees:
+        lefts, rights = tree['left_children'], tree['right_children']
+        offset = len(b.feature)
+        ids = [b.add_node() for _ in lefts]
+        depth = np.zeros(len(lefts), dtype=int)
+        for i, (l, r) in enumerate(zip(lefts, rights)):
+            if l == -1:
+                # Leaf weights live in split_conditions for leaf nodes
+                b.set_leaf(ids[i], tree['split_conditions'][i])
+                continue
+            depth[l] = depth[r] = depth[i] + 1
+            thr = float(np.float32(tree['split_conditions'][i]))
+            b.set_split(ids[i], tree['split_indices'][i], thr, offset + l, offset + r, bool(tree['default_left'][i]))
+        b.max_depth = max(b.max_depth, int(depth.max()))
+        b.roots.append(offset)
+
+    return b.build(base_score=np.log(base / (1.0 - base)), strict=True, feature_names=feature_names)
+
+
+def _compile_catboost(est, feature_names):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.json')
+        est.save_model(path, format='json')
+        with open(path) as f:
+            dump = json.load(f)
+    if 'oblivious_trees' not in dump:
+        raise ValueError("Only symmetric (oblivious) CatBoost trees are supported")
+
+    float_features = dump['features_info']['float_features']
+    scale, bias = dump['scale_and_bias']
+    b = _TreeBuilder()
+
+    # Leaf index of an oblivious tree is sum((x_j > border_j) << j) over its splits;
+    # expand each one into an explicit binary tree with split j at depth j
+    def expand(splits, leaf_values, depth, index):
+        node = b.add_node()
+        if depth == len(splits):
+            b.set_leaf(node, leaf_values[index])
+            return node
+        split = splits[depth]
+        info = float_features[split['float_feature_index']]
+        left = expand(splits, leaf_values, depth + 1, index)
+        right = expand(splits, leaf_values, depth + 1, index | (1 << depth))
+        b.set_split(node, info['flat_feature_index'], float(np.float32(split['border'])),
+                    left, right, info['nan_value_treatment'] != 'AsTrue')
+        return node
+
+    for tree in dump['oblivious_trees']:
+        splits = tree.get('splits') or []
+        if any(s['split_type'] != 'FloatFeature' for s in splits):
+            raise ValueError("Only float feature splits are supported")
+        b.max_depth = max(b.max_depth, len(splits))
+        b.roots.append(expand(splits, tree['leaf_values'], 0, 0))
+
+    bias = bias[0] if isinstance(bias, list) else bias
+    return b.build(base_score=bias, scale=scale, feature_names=feature_names)
+
+
+def _compile_random_forest(est, feature_names):
+    pos = list(est.classes_).index(1)
+    b = _TreeBuilder()
+
+    for tree_est in est.estimators_:
+        tree = tree_est.tree_
+        offset = len(b.feature)
+        ids = [b.add_node() for _ in range(tree.node_count)]
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        for i in range(tree.node_count):
+            l, r = tree.children_left[i], tree.children_right[i]
+            if l == -1:
+                counts = tree.value[i, 0]
+                b.set_leaf(ids[i], counts[pos] / counts.sum())
+                continue
+            b.set_split(ids[i], tree.feature[i], tree.threshold[i], offset + l, offset + r, bool(missing_left[i]))
+        b.max_depth = max(b.max_depth, tree.max_depth)
+        b.roots.append(offset)
+
+    return b.build(scale=1.0 / len(est.estimators_), link='identity', feature_names=feature_names)
+
+
+_COMPILERS = {
+    'LGBMClassifier': _compile_lightgbm,
+    'XGBClassifier': _compile_xgboost,
+    'CatBoostClassifier': _compile_catboost,
+    'RandomForestClassifier': _compile_random_forest,
+}
+
+
+def compile_model(est, feature_names=None):
+    """Export a fitted tree-ensemble classifier to a CompiledEnsemble."""
+    kind = type(est).__name__
+    if kind == 'CompiledEnsemble':
+        return est
+    if kind not in _COMPILERS:
+        raise ValueError(f"Cannot compile {kind}: only tree ensembles are supported")
+    return _COMPILERS[kind](est, feature_names)
@@ -1,38 +1,335 @@
 import pandas as pd
 import os
+import sys
 import numpy as np
 
-def load_data(filepath: str) -> pd.DataFrame:
+# Columnar formats for the processed feature store (both need pyarrow)
+COLUMNAR_FORMATS = ('.parquet', '.feather')
+
+def load_data(filepath: str, columns: list = None, chunksize: int = None):
+    """
+    Reads CSV, Parquet or Feather. With `columns`, only those columns are
+    parsed, so load time and memory scale with what the caller uses.
+    With `chunksize` (CSV and Parquet), returns an iterator of DataFrames.
+    """
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"File not found: {filepath}")
     
+    ext = os.path.splitext(filepath)[1]
+    if ext == '.parquet':
+        if chunksize:
+            return _iter_parquet(filepath, columns, chunksize)
+        return pd.read_parquet(filepath, columns=columns)
+    if ext == '.feather':
+        return pd.read_feather(filepath, columns=columns)
+    
     # Lending Club data cleaning
     # Header is on line 0 for this file version
-    df = pd.read_csv(filepath, low_memory=False) if 'LendingClub' in filepath else pd.read_csv(filepath)
+    df = pd.read_csv(filepath, usecols=columns, chunksize=chunksize, low_memory=False) if 'LendingClub' in filepath else pd.read_csv(filepath, usecols=columns, chunksize=chunksize)
     
     return df
 
+def _iter_parquet(filepath, columns, chunksize):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(filepath).iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+def available_columns(filepath: str) -> list:
+    # Column names without reading any data
+    ext = os.path.splitext(filepath)[1]
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(filepath).names
+    if ext == '.feather':
+        import pyarrow as pa
+        with pa.memory_map(filepath) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_csv(filepath, nrows=0).columns)
+
+def compact_features(df: pd.DataFrame, target_col: str = 'is_default') -> pd.DataFrame:
+    """
+    Typed, compact columns for the feature store: one-hot dummies and the
+    target as uint8, other numerics as float32 (the dtype the model is served with).
+    """
+    out = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == bool or col == target_col:
+            out[col] = values.astype(np.uint8)
+        elif pd.api.types.is_numeric_dtype(values):
+            out[col] = values.astype(np.float32)
+        else:
+            out[col] = values
+    return pd.DataFrame(out, index=df.index)
+
+def save_features(df: pd.DataFrame, filepath: str):
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    df = compact_features(df).reset_index(drop=True)
+    ext = os.path.splitext(filepath)[1]
+    # Written next to the store and renamed, so a failed write keeps the old one
+    tmp = filepath + '.tmp'
+    try:
+        if ext == '.parquet':
+            df.to_parquet(tmp, index=False)
+        elif ext == '.feather':
+            df.to_feather(tmp)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, filepath)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def find_features_file(base_path: str, name: str = 'real_bnpl_features') -> str:
+    # Prefer the columnar store, fall back to the CSV written by older runs
+    for ext in COLUMNAR_FORMATS + ('.csv',):
+        path = os.path.join(base_path, 'data/processed', name + ext)
+        if os.path.exists(path):
+            return path
+    return os.path.join(base_path, 'data/processed', name + '.csv')
+
+def map_categories(col, func):
+    """
+    Apply a string -> float transform once per distinct value instead of once
+    per row, then broadcast the results back through the category codes.
+    LendingClub text columns have few distinct values, so this is mostly
+    integer indexing. Missing values stay NaN.
+    """
+    cat = col.astype('category')
+    values = np.append(np.asarray(func(cat.cat.categories), dtype=float), np.nan)
+    # code -1 (missing) picks the trailing NaN
+    return pd.Series(values[cat.cat.codes.to_numpy()], index=col.index, name=col.name)
+
 def clean_money_col(col):
-    if col.dtype == 'object':
-        return col.str.replace('$', '').str.replace(',', '').astype(float)
+    if not pd.api.types.is_numeric_dtype(col):
+        return map_categories(col, lambda c: c.str.replace('$', '').str.replace(',', '').astype(float))
     return col
 
 def clean_percent_col(col):
-    if col.dtype == 'object':
-        return col.str.replace('%', '').astype(float)
+    # '10.5%' / ' 10.5 %' -> 10.5
+    if not pd.api.types.is_numeric_dtype(col):
+        return map_categories(col, lambda c: c.str.strip(' %').astype(float))
     return col
 
-def split_data(df: pd.DataFrame, target_col: str, test_size: float = 0.2, random_state: int = 42):
+def parse_term_months(col):
+    # ' 36 months' -> 36.0
+    return map_categories(col, lambda c: c.str.extract(r'(\d+)', expand=False).astype(float))
+
+def split_indices(y, test_size: float = 0.2, random_state: int = 42):
+    """
+    Stratified (train, test) row positions. The same rows, in the same order,
+    that split_data has always produced, so holdouts stay comparable.
+    """
     from sklearn.model_selection import train_test_split
-    X = df.drop(columns=[target_col])
-    y = df[target_col]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
-    
-    # Recombine for consistency if caller expects full dfs
-    train_df = X_train.copy()
-    train_df[target_col] = y_train
-    
-    test_df = X_test.copy()
-    test_df[target_col] = y_test
-    
-    return train_df, test_df
+    return train_test_split(np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=y)
+
+def split_data(df: pd.DataFrame, target_col: str, test_size: float = 0.2, random_state: int = 42):
+    train_idx, test_idx = split_indices(df[target_col], test_size, random_state)
+    if df.columns[-1] != target_col:
+        # Callers expect the target as the last column
+        df = df[[c for c in df.columns if c != target_col] + [target_col]]
+    return df.take(train_idx), df.take(test_idx)
+
+def load_training_split(filepath: str, target_col: str = 'is_default', test_size: float = 0.2,
+                        random_state: int = 42, chunksize: int = 50_000):
+    """
+    (X_train, X_test, y_train, y_test) for a processed feature file, as
+    DataFrame/Series views over a float32 matrix of the numerics, a uint8
+    matrix of the columns the store keeps as uint8 (the one-hots of
+    compact_features) and one uint8 target. The target is read first to
+    choose the split (same rows as split_data), then feature chunks are
+    scattered straight into rows ordered [train | test], so peak memory is
+    about one copy of the features at their stored width. Backends that need
+    a single float32 matrix make it when they fit.
+    """
+    names = [c for c in available_columns(filepath) if c != target_col]
+    y = np.asarray(load_data(filepath, columns=[target_col])[target_col], dtype=np.uint8)
+    train_idx, test_idx = split_indices(y, test_size, random_state)
+    n_train = len(train_idx)
+    order = np.concatenate([train_idx, test_idx])
+    del train_idx, test_idx
+    y = y[order]
+    dest = np.empty_like(order)
+    dest[order] = np.arange(len(order))  # file row -> matrix row
+    del order
+
+    narrow = _uint8_columns(filepath, names)
+    groups = [(np.float32, [c for c in names if c not in narrow]), (np.uint8, [c for c in names if c in narrow])]
+    # Rows of each block are scattered whole; the frames below hold column views of them
+    blocks = [np.empty((len(y), len(cols)), dtype=dtype) for dtype, cols in groups]
+    start = 0
+    for chunk in _feature_chunks(filepath, names, chunksize):
+        stop = start + len(chunk)
+        rows = dest[start:stop]
+        for block, (dtype, cols) in zip(blocks, groups):
+            if cols:
+                values = chunk[cols]
+                if dtype is np.uint8 and any(d.kind not in 'bu' for d in values.dtypes) \
+                        and (values.min().min() < 0 or values.max().max() > 255):
+                    raise ValueError(f"{filepath}: one-hot columns hold values outside uint8")
+                block[rows] = values.to_numpy(dtype=dtype)
+        start = stop
+
+    def frame(rows):
+        views = {col: block[rows, i] for block, (_, cols) in zip(blocks, groups) for i, col in enumerate(cols)}
+        return pd.DataFrame({col: views[col] for col in names}, copy=False)
+
+    train, test = slice(0, n_train), slice(n_train, len(y))
+    return (
+        frame(train), frame(test),
+        pd.Series(y[train], name=target_col), pd.Series(y[test], name=target_col),
+    )
+
+def _uint8_columns(filepath, names):
+    # Columns the store types as uint8 or bool. CSV has no types: integer columns
+    # that only hold 0/1 in the first rows are taken for one-hots
+    if filepath.endswith(COLUMNAR_FORMATS):
+        import pyarrow as pa
+        if filepath.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            schema = pq.read_schema(filepath)
+        else:
+            with pa.memory_map(filepath) as source:
+                schema = pa.ipc.open_file(source).schema
+        return {f.name for f in schema
+                if f.name in names and (pa.types.is_uint8(f.type) or pa.types.is_boolean(f.type))}
+    head = pd.read_csv(filepath, usecols=names, nrows=1000)
+    return {c for c in names if pd.api.types.is_bool_dtype(head[c])
+            or (pd.api.types.is_integer_dtype(head[c]) and head[c].isin([0, 1]).all())}
+
+def _feature_chunks(filepath, names, chunksize):
+    # Row blocks of the named columns in file order
+    if filepath.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(filepath)
+        # One row group at a time, freed before the next is read; iter_batches reads ahead
+        for i in range(parquet.num_row_groups):
+            table = parquet.read_row_group(i, columns=names)
+            for batch in table.to_batches(max_chunksize=chunksize):
+                yield batch.to_pandas()
+            del table
+            pa.default_memory_pool().release_unused()
+    elif filepath.endswith('.feather'):
+        yield load_data(filepath, columns=names)
+    else:
+        yield from load_data(filepath, columns=names, chunksize=chunksize)
+
+def share_frames(directory: str, **frames) -> dict:
+    """
+    Write DataFrames and Series to .npy files in `directory`, one file per
+    dtype so uint8 columns stay uint8, for other processes to memory-map with
+    map_frames(). Returns the (small, picklable) spec to hand them. Mapped
+    read-only, the pages are shared, so N workers hold one copy of the data.
+    """
+    from numpy.lib.format import open_memmap
+    spec = {}
+    for name, data in frames.items():
+        if isinstance(data, pd.Series):
+            path = os.path.join(directory, f'{name}.npy')
+            np.save(path, data.to_numpy())
+            spec[name] = {'series': path, 'name': data.name}
+            continue
+        blocks = []
+        by_dtype = {}
+        for col, dtype in data.dtypes.items():
+            by_dtype.setdefault(np.dtype(dtype), []).append(col)
+        for i, (dtype, cols) in enumerate(by_dtype.items()):
+            path = os.path.join(directory, f'{name}.{i}.npy')
+            # Filled a column at a time, so writing needs no second copy in memory
+            out = open_memmap(path, mode='w+', dtype=dtype, shape=(len(data), len(cols)))
+            for j, col in enumerate(cols):
+                out[:, j] = data[col].to_numpy()
+            out.flush()
+            del out
+            blocks.append((path, cols))
+        spec[name] = {'columns': list(data.columns), 'blocks': blocks}
+    return spec
+
+def map_frames(spec: dict) -> dict:
+    """name -> DataFrame/Series of read-only memory-mapped views, for a share_frames() spec."""
+    frames = {}
+    for name, entry in spec.items():
+        if 'series' in entry:
+            frames[name] = pd.Series(np.load(entry['series'], mmap_mode='r'), name=entry['name'], copy=False)
+            continue
+        views = {}
+        for path, cols in entry['blocks']:
+            block = np.load(path, mmap_mode='r')
+            views.update((col, block[:, j]) for j, col in enumerate(cols))
+        frames[name] = pd.DataFrame({col: views[col] for col in entry['columns']}, copy=False)
+    return frames
+
+def memory_report(X_train, X_test, y_train, y_test) -> dict:
+    """Size of a train/test split in memory, to set against the process RSS."""
+    return {
+        'rows': len(X_train) + len(X_test),
+        'features': X_train.shape[1],
+        'dtypes': sorted({str(d) for d in X_train.dtypes}),
+        'feature_mb': sum(int(X.memory_usage(index=False).sum()) for X in (X_train, X_test)) / 2**20,
+        'target_mb': sum(int(y.memory_usage(index=False)) for y in (y_train, y_test)) / 2**20,
+    }
+
+def rss_mb(peak: bool = False) -> float:
+    """Current (Linux only) or peak resident set size of this process in MB."""
+    if not peak and os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    import resource  # Unix only
+    # ru_maxrss is KB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == 'darwin' else maxrss / 1024
+
+class FeatureStoreWriter:
+    """
+    Appends feature chunks to a Parquet (or CSV) store. Chunks must share the
+    same columns; dtypes are compacted so every chunk has the same schema.
+    Chunks go to `<path>.tmp`, renamed over the store by close(); a run that
+    fails part-way (or abort()) leaves the previous store in place.
+    """
+
+    def __init__(self, filepath: str):
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        self.filepath = filepath
+        self.tmp_path = filepath + '.tmp'
+        self.rows = 0
+        self._writer = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def write(self, df: pd.DataFrame):
+        df = compact_features(df).reset_index(drop=True)
+        if self.filepath.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            df.to_csv(self.tmp_path, mode='a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.filepath)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,93 @@
+from collections.abc import Mapping
+import numpy as np
+
+# Raw numeric fields passed straight through to the model
+NUMERIC_FEATURES = [
+    'loan_amnt', 'int_rate', 'installment', 'annual_inc', 'dti',
+    'fico_range_low', 'revol_util', 'total_acc', 'open_acc', 'pub_rec', 'term_months'
+]
+
+# Valid categories observed in training (Lending Club typicals)
+CATEGORIES = {
+    'grade': ['A', 'B', 'C', 'D', 'E', 'F', 'G'],
+    'home_ownership': ['RENT', 'MORTGAGE', 'OWN', 'OTHER', 'NONE', 'ANY'],
+    'verification_status': ['Verified', 'Source Verified', 'Not Verified'],
+    'purpose': [
+        'debt_consolidation', 'credit_card', 'home_improvement', 'other', 'major_purchase',
+        'medical', 'small_business', 'car', 'vacation', 'moving', 'house', 'wedding',
+        'renewable_energy', 'educational'
+    ]
+}
+
+DEFAULT_FEATURE_NAMES = NUMERIC_FEATURES + [
+    f'{cat}_{value}' for cat, values in CATEGORIES.items() for value in values
+]
+
+
+def _getter(record):
+    if isinstance(record, Mapping):
+        return record.get
+    return lambda name, default=None: getattr(record, name, default)
+
+
+class FeatureEncoder:
+    """
+    Maps raw transaction fields onto the model's feature vector.
+    Column indices are resolved once, so encoding a request is a handful of
+    array writes instead of building a dict and a DataFrame.
+    """
+
+    def __init__(self, feature_names=None, categories=None):
+        self.feature_names = list(feature_names or DEFAULT_FEATURE_NAMES)
+        self.n_features = len(self.feature_names)
+        index = {name: i for i, name in enumerate(self.feature_names)}
+
+        self.numeric = [(field, index[field]) for field in NUMERIC_FEATURES if field in index]
+
+        # category -> {value: column}; vocabularies come from the model's schema,
+        # else CATEGORIES. Not inferred from column-name prefixes: a raw column
+        # such as verification_status_joint is not a value of verification_status
+        self.categorical = {}
+        for cat, known in CATEGORIES.items():
+            prefix = f'{cat}_'
+            values = categories[cat] if categories is not None and cat in categories else known
+            self.categorical[cat] = {v: index[f'{prefix}{v}'] for v in values if f'{prefix}{v}' in index}
+
+        self._template = np.zeros(self.n_features, dtype=np.float32)
+
+    @classmethod
+    def from_model(cls, model):
+        # Prefer the vocabularies saved with the model over ones inferred from column names
+        return cls(model.feature_names, model.schema.get('categories'))
+
+    def encode(self, record, out=None):
+        """Encode one record (dict or object with attributes) into a float32 row."""
+        if out is None:
+            out = self._template.copy()
+        else:
+            out[:] = 0.0
+
+        get = _getter(record)
+        for field, col in self.numeric:
+            out[col] = get(field, 0.0)
+        for cat, columns in self.categorical.items():
+            col = columns.get(get(cat))
+            if col is not None:
+                out[col] = 1.0
+        return out
+
+    def encode_batch(self, records):
+        """Encode a sequence of records into an (n, n_features) float32 matrix."""
+        n = len(records)
+        X = np.zeros((n, self.n_features), dtype=np.float32)
+        getters = [_getter(r) for r in records]
+
+        for field, col in self.numeric:
+            X[:, col] = [get(field, 0.0) for get in getters]
+
+        rows = np.arange(n)
+        for cat, columns in self.categorical.items():
+            cols = np.array([columns.get(get(cat), -1) for get in getters], dtype=np.intp)
+            known = cols >= 0
+            X[rows[known], cols[known]] = 1.0
+        return X
@@ -1,50 +1,70 @@
 import pandas as pd
 import numpy as np
+import json
+import os
+from src.data_utils import clean_percent_col, parse_term_months
 
-def create_features(df: pd.DataFrame) -> pd.DataFrame:
+# Finalized loan statuses and the subset counted as defaults
+VALID_STATUS = ['Fully Paid', 'Charged Off', 'Default', 'Does not meet the credit policy. Status:Fully Paid', 'Does not meet the credit policy. Status:Charged Off']
+BAD_INDICATORS = ['Charged Off', 'Default', 'Does not meet the credit policy. Status:Charged Off']
+
+NUM_COLS = [
+    'loan_amnt', 'int_rate', 'installment', 'annual_inc', 'dti', 
+    'fico_range_low', 'revol_util', 'total_acc', 'open_acc', 'pub_rec'
+]
+CAT_COLS = ['grade', 'home_ownership', 'verification_status', 'purpose']
+
+# Raw columns create_features reads; everything else in the dump can be skipped at parse time
+RAW_COLUMNS = ['loan_status', 'term'] + NUM_COLS + CAT_COLS
+
+def create_features(df: pd.DataFrame, schema: dict = None) -> pd.DataFrame:
     """
     Transforms raw Lending Club data into features for the risk model.
+    If a feature schema is given (see build_feature_schema), its medians are
+    used for NA fill and its vocabularies fix the one-hot columns; a model
+    sidecar's feature_names also fix the column order.
     """
     # 1. Target Definition
     # Filter for finalized loan statuses
-    valid_status = ['Fully Paid', 'Charged Off', 'Default', 'Does not meet the credit policy. Status:Fully Paid', 'Does not meet the credit policy. Status:Charged Off']
+    valid_status = VALID_STATUS
     df = df[df['loan_status'].isin(valid_status)].copy()
     
     # Target: 1 if Default/Charged Off, 0 if Fully Paid
-    bad_indicators = ['Charged Off', 'Default', 'Does not meet the credit policy. Status:Charged Off']
-    df['is_default'] = df['loan_status'].apply(lambda x: 1 if x in bad_indicators else 0)
+    bad_indicators = BAD_INDICATORS
+    df['is_default'] = df['loan_status'].isin(bad_indicators).astype(int)
     
     # 2. Financial Conversions
     # Handle int_rate which might be string '10.5%'
-    if df['int_rate'].dtype == 'object':
-        df['int_rate'] = df['int_rate'].str.strip(' %').astype(float)
+    df['int_rate'] = clean_percent_col(df['int_rate'])
         
     # Handle revol_util which matches '50%'
-    if df['revol_util'].dtype == 'object':
-        df['revol_util'] = df['revol_util'].str.strip(' %').astype(float)
+    df['revol_util'] = clean_percent_col(df['revol_util'])
 
     # 3. Feature Selection & Mapping
     # Map real columns to our standardized feature set names where possible, or use them directly
     
     # Numeric features
-    num_cols = [
-        'loan_amnt', 'int_rate', 'installment', 'annual_inc', 'dti', 
-        'fico_range_low', 'revol_util', 'total_acc', 'open_acc', 'pub_rec'
-    ]
+    num_cols = NUM_COLS
+    medians = schema['medians'] if schema is not None else {}
     
     # Fill NAs
     for col in num_cols:
         if col in df.columns:
-            df[col] = df[col].fillna(df[col].median())
+            df[col] = df[col].fillna(medians[col] if col in medians else df[col].median())
         else:
              df[col] = 0 # Fallback
             
     # Categorical features
     # term (clean first), grade, home_ownership, verification_status
     if 'term' in df.columns:
-        df['term_months'] = df['term'].str.extract('(\d+)').astype(float)
+        df['term_months'] = parse_term_months(df['term'])
+    
+    cat_cols = CAT_COLS
     
-    cat_cols = ['grade', 'home_ownership', 'verification_status', 'purpose']
+    if schema is not None:
+        # Fixed vocabulary: every known category gets a column, unseen values get none
+        for col in cat_cols:
+            df[col] = pd.Categorical(df[col], categories=schema['categories'][col])
     
     # One-Hot Encoding
     df_encoded = pd.get_dummies(df, columns=cat_cols, dummy_na=False)
@@ -57,9 +77,18 @@ def create_features(df: pd.DataFrame) -> pd.DataFrame:
     # Let's align some critical ones to the previous schema to minimize API breakage?
     # Actually, better to update API to real names.
     
-    # Identify One-Hot columns: they start with the prefix and a separator (usually _)
-    encoded_cols = [c for c in df_encoded.columns if any(c.startswith(p + '_') for p in cat_cols)]
+    # Identify One-Hot columns: the ones get_dummies added. A prefix match would
+    # also pick up raw columns such as verification_status_joint
+    if schema is not None:
+        encoded_cols = [f'{col}_{v}' for col in cat_cols for v in schema['categories'][col]]
+    else:
+        encoded_cols = [c for c in df_encoded.columns if c not in df.columns]
     
+    if schema is not None and 'feature_names' in schema:
+        # A model sidecar: that model's exact column layout. Columns this pipeline
+        # no longer produces are 0, as FeatureEncoder leaves them at serving
+        return df_encoded.reindex(columns=list(schema['feature_names']) + ['is_default'], fill_value=0)
+
     final_cols = num_cols + ['term_months'] + encoded_cols + ['is_default']
     
     # Ensure all exist and are subset of df_encoded
@@ -67,5 +96,119 @@ def create_features(df: pd.DataFrame) -> pd.DataFrame:
     
     return df_encoded[final_cols]
 
+def align_features(X: pd.DataFrame, feature_names: list) -> pd.DataFrame:
+    """
+    X with exactly a model's `feature_names`, in that order, for scoring a
+    processed store the model was not trained on. One-hot columns the data
+    lacks (a category value it never contains) are 0, as FeatureEncoder and
+    create_features(df, schema) leave them; a missing numeric feature raises
+    ValueError instead of being scored as 0.
+    """
+    if not feature_names or list(X.columns) == list(feature_names):
+        return X
+    missing = [c for c in feature_names if c not in X.columns]
+    numeric = [c for c in missing if c in NUM_COLS or c == 'term_months']
+    if numeric:
+        raise ValueError(f"Data is missing numeric model features: {numeric}")
+    return X.reindex(columns=list(feature_names), fill_value=0)
+
 def get_feature_names(df: pd.DataFrame) -> list:
     return list(df.columns)
+
+def build_feature_schema(df: pd.DataFrame) -> dict:
+    """
+    Training statistics create_features depends on: NA-fill medians for the
+    numeric columns and the category vocabulary for each one-hot column.
+    Only the needed columns of the finalized-status rows are touched.
+    """
+    return scan_feature_schema([df])
+
+# Values per numeric column kept for the medians; below this they are exact
+MEDIAN_SAMPLE_SIZE = 1_000_000
+
+class _Reservoir:
+    """Uniform sample of at most `size` non-NaN values from a stream (Algorithm R)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.sample = np.empty(0)
+        self.seen = 0
+
+    def add(self, values):
+        values = values[~np.isnan(values)]
+        take = min(len(values), self.size - len(self.sample))
+        if take:
+            self.sample = np.concatenate([self.sample, values[:take]])
+            self.seen += take
+        rest = values[take:]
+        if len(rest):
+            # The i-th value seen (from 0) lands in a random slot of [0, i], kept if that slot exists
+            slots = self.rng.integers(0, self.seen + 1 + np.arange(len(rest)))
+            keep = slots < self.size
+            self.sample[slots[keep]] = rest[keep]
+            self.seen += len(rest)
+
+def scan_feature_schema(chunks, sample_size: int = MEDIAN_SAMPLE_SIZE, seed: int = 0) -> dict:
+    """
+    build_feature_schema over an iterable of raw chunks, in bounded memory: the
+    category sets, and medians from a uniform sample of up to `sample_size`
+    values per numeric column (exact when a column has fewer values).
+    """
+    rng = np.random.default_rng(seed)
+    samples = {col: _Reservoir(sample_size, rng) for col in NUM_COLS}
+    present = set()
+    categories = {}
+    for df in chunks:
+        mask = df['loan_status'].isin(VALID_STATUS)
+        for col in NUM_COLS:
+            if col not in df.columns:
+                continue
+            present.add(col)
+            samples[col].add(clean_percent_col(df.loc[mask, col]).to_numpy(dtype=np.float64))
+        for col in CAT_COLS:
+            if col in df.columns:
+                categories.setdefault(col, set()).update(df.loc[mask, col].dropna().astype(str).unique())
+
+    medians = {}
+    for col in NUM_COLS:
+        if col in present:
+            values = samples[col].sample
+            medians[col] = float(np.median(values)) if len(values) else float('nan')
+
+    return {
+        'medians': medians,
+        'categories': {col: sorted(values) for col, values in categories.items()}
+    }
+
+def stream_features(chunks, schema: dict):
+    """
+    create_features applied chunk by chunk. The schema fixes medians and the
+    one-hot vocabulary, so every chunk comes out with the same columns.
+    """
+    for df in chunks:
+        yield create_features(df, schema=schema)
+
+def save_feature_schema(schema: dict, path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(schema, f, indent=2)
+
+def validate_feature_schema(schema: dict, source: str = 'feature schema') -> dict:
+    """
+    Check a schema has what create_features needs: a 'medians' mapping and a
+    'categories' vocabulary for every one-hot column. Numeric columns without
+    a median are filled with the data's own median.
+    """
+    missing = [key for key in ('medians', 'categories') if not isinstance(schema.get(key), dict)]
+    if not missing:
+        missing = [f'categories[{col!r}]' for col in CAT_COLS if col not in schema['categories']]
+    if missing:
+        raise ValueError(
+            f"{source} has no {', '.join(missing)}. Use the feature_schema.json written by "
+            f"process_data_script.py, or a model sidecar with it merged in (compile_model.py)")
+    return schema
+
+def load_feature_schema(path: str) -> dict:
+    with open(path) as f:
+        return validate_feature_schema(json.load(f), source=path)
@@ -1,33 +1,98 @@
 import numpy as np
 
-def calculate_expected_profit(prob_default, amount, merchant_fee_rate=0.03, lgd=0.8, interest_rate=0.15):
+# Policy tables. A probability of default below LIMIT_BANDS[i] (and not below
+# the previous band) earns LIMIT_AMOUNTS[i]; anything else LIMIT_AMOUNTS[-1].
+LIMIT_BANDS = (0.02, 0.05, 0.10, 0.20)
+LIMIT_AMOUNTS = (5000, 3000, 1000, 500, 0)
+
+# Unit economics of one loan
+PRICING = {
+    'merchant_fee_rate': 0.03,  # paid by the merchant up front
+    'lgd': 0.8,                 # share of the amount lost on default
+    'interest_rate': 0.15,      # earned over half the amount on average
+}
+
+def _pricing(merchant_fee_rate, lgd, interest_rate):
+    return (
+        PRICING['merchant_fee_rate'] if merchant_fee_rate is None else merchant_fee_rate,
+        PRICING['lgd'] if lgd is None else lgd,
+        PRICING['interest_rate'] if interest_rate is None else interest_rate,
+    )
+
+def calculate_expected_profit(prob_default, amount, merchant_fee_rate=None, lgd=None, interest_rate=None):
+    merchant_fee_rate, lgd, interest_rate = _pricing(merchant_fee_rate, lgd, interest_rate)
     expected_interest = amount * interest_rate * 0.5 * (1 - prob_default)
     expected_revenue = (amount * merchant_fee_rate) + expected_interest
-    
+
     expected_loss = amount * prob_default * lgd
-    
+
     return expected_revenue - expected_loss
 
-def get_recommended_limit(prob_default, base_limit=1000, max_limit=5000):
-    if prob_default < 0.02:
-        return max_limit
-    elif prob_default < 0.05:
-        return 3000
-    elif prob_default < 0.10:
-        return 1000
-    elif prob_default < 0.20:
-        return 500
-    else:
-        return 0
+def get_recommended_limit(prob_default, base_limit=1000, max_limit=None, bands=LIMIT_BANDS, amounts=LIMIT_AMOUNTS):
+    if max_limit is not None:
+        amounts = (max_limit,) + tuple(amounts[1:])
+    for bound, limit in zip(bands, amounts):
+        if prob_default < bound:
+            return limit
+    return amounts[-1]
 
 def make_decision(prob_default, amount, threshold=0.15, fico_score=None, dti=None, min_fico=600, max_dti=40):
     if fico_score is not None and fico_score < min_fico:
         return "REJECT"
-    
+
     if dti is not None and dti > max_dti:
         return "REJECT"
-    
+
     if prob_default > threshold:
         return "REJECT"
-    
+
     return "APPROVE"
+
+
+# Array versions: same rules and tables, one NumPy pass over a whole book
+
+def calculate_expected_profit_batch(prob_default, amount, merchant_fee_rate=None, lgd=None, interest_rate=None):
+    return calculate_expected_profit(
+        np.asarray(prob_default, dtype=float), np.asarray(amount, dtype=float),
+        merchant_fee_rate, lgd, interest_rate
+    )
+
+def get_recommended_limit_batch(prob_default, max_limit=None, bands=LIMIT_BANDS, amounts=LIMIT_AMOUNTS):
+    amounts = np.array(amounts)
+    if max_limit is not None:
+        amounts[0] = max_limit
+    # side='right': a probability equal to a bound falls in the next band, as with `<` above.
+    # NaN sorts past every bound and gets the last amount, like the scalar version.
+    return amounts[np.searchsorted(bands, np.asarray(prob_default, dtype=float), side='right')]
+
+def reject_mask(prob_default, threshold=0.15, fico_score=None, dti=None, min_fico=600, max_dti=40):
+    # Rows make_decision would reject
+    reject = np.asarray(prob_default, dtype=float) > threshold
+    if fico_score is not None:
+        reject |= np.asarray(fico_score, dtype=float) < min_fico
+    if dti is not None:
+        reject |= np.asarray(dti, dtype=float) > max_dti
+    return reject
+
+def make_decision_batch(prob_default, amount, threshold=0.15, fico_score=None, dti=None, min_fico=600, max_dti=40):
+    # Array version of make_decision: same rules, evaluated with boolean masks
+    reject = reject_mask(prob_default, threshold, fico_score, dti, min_fico, max_dti)
+    return np.where(reject, "REJECT", "APPROVE")
+
+def apply_policy_batch(prob_default, amount, threshold=0.15, fico_score=None, dti=None, min_fico=600, max_dti=40,
+                       pricing=None, bands=LIMIT_BANDS, amounts=LIMIT_AMOUNTS):
+    """
+    Decision, reported probability, limit and expected profit for a whole book,
+    matching the /predict response row by row. Rule-based rejects are reported
+    (and priced) as certain defaults.
+    """
+    prob_default = np.asarray(prob_default, dtype=float)
+    amount = np.asarray(amount, dtype=float)
+    approved = ~reject_mask(prob_default, threshold, fico_score, dti, min_fico, max_dti)
+    final_prob = np.where(~approved & (prob_default <= threshold), 1.0, prob_default)
+    return {
+        'approved': approved,
+        'probability_of_default': final_prob,
+        'recommended_limit': np.where(approved, get_recommended_limit_batch(final_prob, bands=bands, amounts=amounts), 0),
+        'expected_profit': calculate_expected_profit_batch(final_prob, amount, **(pricing or {})),
+    }
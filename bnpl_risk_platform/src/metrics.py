@@ -0,0 +1,181 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# In-process counters and latency histograms, rendered in the Prometheus text
+# exposition format. Recording is a bisect plus two increments under a lock,
+# cheap enough to leave on for every request.
+
+# Seconds; spans the sub-millisecond model call up to slow batch requests
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Set by TimingMiddleware when a request arrives, read by handlers to time parsing
+request_start = ContextVar('request_start', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate from bucket counts with linear interpolation, like histogram_quantile()."""
+        if self.count == 0:
+            return float('nan')
+        rank = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            if cumulative + c >= rank and c > 0:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - cumulative) / c
+            cumulative += c
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    def __init__(self, prefix='bnpl'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value_fn, **labels):
+        # value_fn is called at scrape time, so owners need not push updates
+        self._gauges[(name, tuple(sorted(labels.items())))] = value_fn
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self, name, **labels):
+        """p50/p95/p99/count of one histogram, e.g. for JSON health output."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                return None
+            return {'count': hist.count, **{f'p{int(q * 100)}': hist.quantile(q) for q in QUANTILES}}
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+            hist_data = [(key, list(h.counts), h.sum, h.count, [h.quantile(q) for q in QUANTILES], h.bounds)
+                         for key, h in histograms]
+        gauges = sorted(self._gauges.items(), key=lambda kv: kv[0])
+
+        def header(name, kind):
+            full = f'{self.prefix}_{name}'
+            if name in self._help:
+                lines.append(f'# HELP {full} {self._help[name]}')
+            lines.append(f'# TYPE {full} {kind}')
+            return full
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                full = header(name, 'counter')
+                seen.add(name)
+            lines.append(f'{full}{_labels(labels)} {value}')
+
+        for (name, labels), value_fn in gauges:
+            if name not in seen:
+                full = header(name, 'gauge')
+                seen.add(name)
+            lines.append(f'{full}{_labels(labels)} {float(value_fn())}')
+
+        for (name, labels), counts, total, count, quantiles, bounds in hist_data:
+            if name not in seen:
+                full = header(name, 'histogram')
+                seen.add(name)
+            cumulative = 0
+            for bound, c in zip(list(bounds) + ['+Inf'], counts):
+                cumulative += c
+                lines.append(f'{full}_bucket{_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{full}_sum{_labels(labels)} {total}')
+            lines.append(f'{full}_count{_labels(labels)} {count}')
+
+        # Bucket-estimated percentiles for dashboards that do not run histogram_quantile()
+        seen_q = set()
+        for (name, labels), counts, total, count, quantiles, bounds in hist_data:
+            qname = f'{name}_quantile'
+            if qname not in seen_q:
+                full = header(qname, 'gauge')
+                seen_q.add(qname)
+            for q, value in zip(QUANTILES, quantiles):
+                lines.append(f'{full}{_labels(labels + (("quantile", str(q)),))} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware: records total request latency per route and marks the
+    request start so handlers can attribute body parsing/validation time.
+    """
+
+    def __init__(self, app, registry, paths=None):
+        self.app = app
+        self.registry = registry
+        self.paths = set(paths) if paths else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        token = request_start.set(start)
+        path = scope['path']
+        # Unknown paths share one label so scanners cannot blow up cardinality
+        if self.paths is not None and path not in self.paths:
+            path = 'other'
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_start.reset(token)
+            self.registry.observe('request_seconds', time.perf_counter() - start, path=path)
@@ -1,82 +1,374 @@
-import lightgbm as lgb
-import xgboost as xgb
-import catboost as cb
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-import joblib
+import importlib
+import json
 import os
-from sklearn.metrics import roc_auc_score, recall_score, precision_score
+import tempfile
+import numpy as np
+from src.compiled import CompiledEnsemble, compile_model, FLAT_EXT
+
+# model_type -> (module, estimator class). Backends are imported on first use, so
+# serving one champion does not pay for every ML library at startup.
+BACKENDS = {
+    'lightgbm': ('lightgbm', 'LGBMClassifier'),
+    'xgboost': ('xgboost', 'XGBClassifier'),
+    'catboost': ('catboost', 'CatBoostClassifier'),
+    'rf': ('sklearn.ensemble', 'RandomForestClassifier'),
+    'logreg': ('sklearn.linear_model', 'LogisticRegression'),
+}
+
+def load_backend(model_type):
+    if model_type not in BACKENDS:
+        raise ValueError(f"Unknown model_type: {model_type}")
+    module, name = BACKENDS[model_type]
+    return getattr(importlib.import_module(module), name)
+
+# Constructor argument each backend takes for its thread count; logreg (lbfgs)
+# only uses BLAS threads, which callers cap with threadpoolctl
+THREAD_PARAMS = {'lightgbm': 'n_jobs', 'xgboost': 'n_jobs', 'catboost': 'thread_count', 'rf': 'n_jobs'}
+
+# Hyperparameters train() uses when none are given; tuned params from
+# src.tuning are applied on top of these
+DEFAULT_PARAMS = {
+    'lightgbm': {'objective': 'binary', 'metric': 'auc', 'verbosity': -1, 'n_estimators': 100},
+    'xgboost': {'objective': 'binary:logistic', 'eval_metric': 'auc', 'n_estimators': 100},
+    'catboost': {'loss_function': 'Logloss', 'eval_metric': 'AUC', 'n_estimators': 100, 'verbose': 0},
+    'rf': {'n_estimators': 100, 'max_depth': 10, 'random_state': 42},
+    'logreg': {'max_iter': 1000, 'solver': 'lbfgs'},
+}
+
+# Estimator class -> model_type, for artifacts saved without a schema sidecar
+ESTIMATOR_TYPES = {
+    'LGBMClassifier': 'lightgbm',
+    'XGBClassifier': 'xgboost',
+    'CatBoostClassifier': 'catboost',
+    'RandomForestClassifier': 'rf',
+    'LogisticRegression': 'logreg',
+}
+
+def replace_atomically(path, write):
+    """
+    Call write(tmp_path) on a temp file next to `path`, then rename it over
+    `path`. A serving process reloading the artifact sees the old file or the
+    new one, never a partial write.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
 
 class RiskModel:
-    def __init__(self, model_path=None, model_type='lightgbm'):
+    def __init__(self, model_path=None, model_type='lightgbm', native=False, n_threads=None):
         self.model = None
         self.model_path = model_path
         self.model_type = model_type
+        self.schema = {}
+        # Serving mode: call the underlying booster directly on float32 arrays
+        self.native = native
+        self.n_threads = n_threads
+        self._native_predict = None
         
         if model_path and os.path.exists(model_path):
             self.load(model_path)
 
-    def train(self, X_train, y_train, X_val=None, y_val=None, params=None):
+    def train(self, X_train, y_train, X_val=None, y_val=None, params=None, feature_schema=None,
+              early_stopping_rounds=None):
+        """
+        Fit a fresh estimator (DEFAULT_PARAMS unless `params` are given). With
+        `early_stopping_rounds` and a validation set, boosters stop once the
+        validation metric has not improved for that many rounds and keep the
+        best iteration; rf and logreg ignore it.
+        """
+        # Input layout saved next to the model so serving never has to guess it
+        self.schema = dict(feature_schema or {})
+        if hasattr(X_train, 'columns'):
+            self.schema['feature_names'] = list(X_train.columns)
+            self.schema['dtypes'] = {col: str(dtype) for col, dtype in X_train.dtypes.items()}
+
+        if self.model_type not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown model_type: {self.model_type}")
+        params = dict(DEFAULT_PARAMS[self.model_type] if params is None else params)
+        stop = early_stopping_rounds if X_val is not None else None
+
         if self.model_type == 'lightgbm':
-            if params is None:
-                params = {'objective': 'binary', 'metric': 'auc', 'verbosity': -1, 'n_estimators': 100}
-            self.model = lgb.LGBMClassifier(**params)
+            callbacks = [importlib.import_module('lightgbm').early_stopping(stop, verbose=False)] if stop else None
+            self.model = load_backend('lightgbm')(**self._with_threads(params))
             eval_set = [(X_val, y_val)] if X_val is not None else None
-            self.model.fit(X_train, y_train, eval_set=eval_set)
+            self.model.fit(X_train, y_train, eval_set=eval_set, callbacks=callbacks)
             
         elif self.model_type == 'xgboost':
-            if params is None:
-                params = {'objective': 'binary:logistic', 'eval_metric': 'auc', 'n_estimators': 100}
-            self.model = xgb.XGBClassifier(**params)
+            if stop:
+                params['early_stopping_rounds'] = stop
+            self.model = load_backend('xgboost')(**self._with_threads(params))
             eval_set = [(X_val, y_val)] if X_val is not None else None
             self.model.fit(X_train, y_train, eval_set=eval_set, verbose=False)
             
         elif self.model_type == 'catboost':
-            if params is None:
-                params = {'loss_function': 'Logloss', 'eval_metric': 'AUC', 'n_estimators': 100, 'verbose': 0}
-            self.model = cb.CatBoostClassifier(**params)
+            # CatBoost would shrink to the best iteration on any eval_set; only do
+            # that when early stopping asked for it, not for a set passed just to log
+            self.model = load_backend('catboost')(**self._with_threads(params))
             eval_set = (X_val, y_val) if X_val is not None else None
-            self.model.fit(X_train, y_train, eval_set=eval_set)
-            
-        elif self.model_type == 'rf':
-            if params is None:
-                params = {'n_estimators': 100, 'max_depth': 10, 'random_state': 42}
-            self.model = RandomForestClassifier(**params)
-            self.model.fit(X_train, y_train)
+            self.model.fit(X_train, y_train, eval_set=eval_set, early_stopping_rounds=stop,
+                           use_best_model=bool(stop))
             
-        elif self.model_type == 'logreg':
-            if params is None:
-                params = {'max_iter': 1000, 'solver': 'lbfgs'}
-            self.model = LogisticRegression(**params)
+        else:
+            self.model = load_backend(self.model_type)(**self._with_threads(params))
             self.model.fit(X_train, y_train)
-            
+
+        if self.native:
+            self.enable_native()
+        return self.model
+
+    def update(self, X_new, y_new, n_estimators=20, X_val=None, y_val=None, params=None):
+        """
+        Warm start: add `n_estimators` trees fitted to the current model's
+        residuals on new rows only (LightGBM init_model, XGBoost xgb_model,
+        CatBoost init_model). Hyperparameters, learning rate included, carry
+        over from the fitted model unless overridden in `params`.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained or loaded")
+        if self.model_type not in ('lightgbm', 'xgboost', 'catboost'):
+            raise ValueError(f"{self.model_type} does not support incremental training")
+        if isinstance(self.model, CompiledEnsemble):
+            raise ValueError("Compiled artifacts cannot be trained further; load the pickled model")
+
+        names = self.feature_names
+        if names and hasattr(X_new, 'columns'):
+            missing = [c for c in names if c not in X_new.columns]
+            if missing:
+                raise ValueError(f"New data is missing model features: {missing}")
+            X_new = X_new if list(X_new.columns) == names else X_new[names]
+            if X_val is not None and list(X_val.columns) != names:
+                X_val = X_val[names]
+
+        fitted = self.model
+        params = dict(fitted.get_params(), **(params or {}))
+        if self.model_type == 'catboost':
+            # CatBoost picks a learning rate from the data size unless told; keep the one the trees were built with
+            params.setdefault('learning_rate', fitted.get_all_params()['learning_rate'])
+            params.pop('iterations', None)
+        # Early stopping belongs to the original fit; the refresh adds exactly n_estimators trees
+        params.pop('early_stopping_rounds', None)
+        params['n_estimators'] = n_estimators
+        model = load_backend(self.model_type)(**self._with_threads(params))
+
+        if self.model_type == 'lightgbm':
+            eval_set = [(X_val, y_val)] if X_val is not None else None
+            model.fit(X_new, y_new, eval_set=eval_set, init_model=fitted.booster_)
+        elif self.model_type == 'xgboost':
+            eval_set = [(X_val, y_val)] if X_val is not None else None
+            # Continue from the best iteration, not the rounds boosted past it before stopping
+            booster = fitted.get_booster()
+            best = getattr(fitted, 'best_iteration', None)
+            if best is not None and best + 1 < booster.num_boosted_rounds():
+                booster = booster[:best + 1]
+            model.fit(X_new, y_new, eval_set=eval_set, verbose=False, xgb_model=booster)
         else:
-            raise ValueError(f"Unknown model_type: {self.model_type}")
+            # use_best_model would cut the refresh back to its best iteration on X_val,
+            # which callers also use to judge the refresh
+            eval_set = (X_val, y_val) if X_val is not None else None
+            model.fit(X_new, y_new, eval_set=eval_set, init_model=fitted, use_best_model=False)
 
+        self.model = model
+        self._native_predict = None
+        if self.native:
+            self.enable_native()
         return self.model
 
+    def _with_threads(self, params):
+        # n_threads caps training too, unless params already set a thread count
+        key = THREAD_PARAMS.get(self.model_type)
+        if self.n_threads is None or key is None or key in params:
+            return params
+        return dict(params, **{key: self.n_threads})
+
+    def enable_native(self):
+        """
+        Bind a predictor that bypasses the sklearn-style wrapper (input
+        validation, DataFrame handling) and calls the fitted booster directly;
+        CatBoost has no such call and keeps its predict().
+        Takes (X, n_threads) with X a C-contiguous float32 array.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained or loaded")
+        est = self.model
+        kind = type(est).__name__
+
+        if kind == 'LGBMClassifier':
+            booster = est.booster_
+            # 0 lets LightGBM pick its OpenMP default
+            predict = lambda X, n: booster.predict(X, num_threads=n or 0)
+
+        elif kind == 'XGBClassifier':
+            booster = est.get_booster()
+            best = getattr(est, 'best_iteration', None)
+            iteration_range = (0, best + 1) if best is not None else (0, 0)
+            # inplace_predict takes no thread count; nthread is a booster parameter, and
+            # setting it per call would race between executor threads. One copy per count
+            boosters = {}
+            def by_threads(n):
+                if n not in boosters:
+                    copy = booster.copy()
+                    copy.set_param({'nthread': n or 0})
+                    boosters[n] = copy
+                return boosters[n]
+            for n in {1, self.n_threads}:
+                by_threads(n)
+            predict = lambda X, n: by_threads(n).inplace_predict(X, iteration_range=iteration_range)
+
+        elif kind == 'CatBoostClassifier':
+            # Not a fast path: CatBoost has no call below predict() that skips building a
+            # Pool, and the Pool is most of the cost (~230us of ~260us for one row). This
+            # only saves the DataFrame handling; the compiled .trees artifact is the fast
+            # scorer for small batches (see src.serving)
+            predict = lambda X, n: est.predict(X, prediction_type='Probability', thread_count=n or -1)[:, 1]
+
+        elif kind == 'RandomForestClassifier':
+            trees = est.estimators_
+            pos = list(est.classes_).index(1)
+            def predict(X, n):
+                proba = trees[0].predict_proba(X, check_input=False)[:, pos].astype(np.float64)
+                for tree in trees[1:]:
+                    proba += tree.predict_proba(X, check_input=False)[:, pos]
+                return proba / len(trees)
+
+        elif kind == 'CompiledEnsemble':
+            predict = lambda X, n: est.predict_proba(X)[:, 1]
+
+        elif kind == 'LogisticRegression':
+            coef = est.coef_.ravel()
+            intercept = float(est.intercept_[0])
+            predict = lambda X, n: 1.0 / (1.0 + np.exp(-(X.astype(np.float64) @ coef + intercept)))
+
+        else:
+            raise ValueError(f"No native predictor for {kind}")
+
+        self._native_predict = predict
+        self.native = True
+        return predict
+
     def predict_proba(self, X):
         if self.model is None:
             raise ValueError("Model not trained or loaded")
+        if self._native_predict is not None:
+            if hasattr(X, 'columns'):
+                names = self.feature_names
+                X = (X[names] if names else X).to_numpy(dtype=np.float32)
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            # A single row is cheaper on one thread than waking a thread pool
+            n_threads = 1 if X.shape[0] == 1 else self.n_threads
+            return self._native_predict(X, n_threads)
         return self.model.predict_proba(X)[:, 1]
 
-    def evaluate(self, X_test, y_test):
+    @property
+    def trees_used(self):
+        """Trees (boosting rounds) the fitted model predicts with, after early stopping."""
+        est = self.model
+        kind = type(est).__name__
+        if kind == 'LGBMClassifier':
+            return est.booster_.best_iteration or est.booster_.current_iteration()
+        if kind == 'XGBClassifier':
+            best = getattr(est, 'best_iteration', None)
+            return best + 1 if best is not None else est.get_booster().num_boosted_rounds()
+        if kind == 'CatBoostClassifier':
+            return est.tree_count_
+        if kind == 'RandomForestClassifier':
+            return len(est.estimators_)
+        if kind == 'CompiledEnsemble':
+            return est.n_trees
+        return None
+
+    @property
+    def feature_names(self):
+        # Column order the estimator was fitted with, so callers can build
+        # plain arrays instead of relying on DataFrame name alignment
+        if 'feature_names' in self.schema:
+            return list(self.schema['feature_names'])
+        if self.model is None:
+            return None
+        for attr in ('feature_names_', 'feature_name_', 'feature_names_in_'):
+            names = getattr(self.model, attr, None)
+            if names is not None:
+                return list(names)
+        return None
+
+    def evaluate(self, X_test, y_test, threshold=0.2):
+        from sklearn.metrics import roc_auc_score, recall_score
         preds = self.predict_proba(X_test)
         auc = roc_auc_score(y_test, preds)
         
-        # Calculate expected profit (using simple defaults)
-        # This belongs in logic, but good for summary
-        # Assuming threshold 0.2 approx
-        hard_preds = (preds > 0.2).astype(int) 
+        # Recall at a fixed cut-off; the EMV-optimal one comes from optimize_policy.py
+        hard_preds = (preds > threshold).astype(int) 
         recall = recall_score(y_test, hard_preds) # Recall on default class (1)
         
-        return {'auc': auc, 'recall_at_0.2': recall}
+        return {'auc': auc, f'recall_at_{threshold}': recall}
+
+    @staticmethod
+    def schema_path(path):
+        return os.path.splitext(path)[0] + '.schema.json'
+
+    def compile(self):
+        """Flatten the fitted tree ensemble into NumPy arrays (see src.compiled)."""
+        if self.model is None:
+            raise ValueError("Model not trained or loaded")
+        return compile_model(self.model, self.feature_names)
 
     def save(self, path):
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        joblib.dump(self.model, path)
+        # Compiled artifacts (.npz loadable with NumPy alone, .trees memory-mappable);
+        # compile before touching any file so an uncompilable model changes nothing
+        compiled = self.compile() if path.endswith(('.npz', FLAT_EXT)) else None
+
+        # Sidecar first: once the artifact itself changes, its schema is already in place
+        schema = dict(self.schema, model_type=self.model_type)
+        if 'feature_names' not in schema and self.feature_names is not None:
+            schema['feature_names'] = self.feature_names
+
+        def write_schema(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(schema, f, indent=2)
+        replace_atomically(self.schema_path(path), write_schema)
+
+        # Every format is written to a temp file and renamed, so a running API
+        # can reload the artifact while it is being replaced
+        if path.endswith('.npz'):
+            replace_atomically(path, compiled.save)
+        elif path.endswith(FLAT_EXT):
+            compiled.save_flat(path)
+        else:
+            import joblib
+            replace_atomically(path, lambda tmp: joblib.dump(self.model, tmp))
         print(f"Model saved to {path}")
 
     def load(self, path):
-        self.model = joblib.load(path)
+        if path.endswith('.npz'):
+            self.model = CompiledEnsemble.load(path)
+        elif path.endswith(FLAT_EXT):
+            self.model = CompiledEnsemble.load_flat(path)
+        else:
+            # Unpickling imports only the backend the estimator belongs to
+            import joblib
+            self.model = joblib.load(path)
         self.model_path = path
+
+        # Older artifacts have no sidecar; fall back to what the estimator exposes
+        self._native_predict = None
+        self.schema = {}
+        schema_path = self.schema_path(path)
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                self.schema = json.load(f)
+            self.model_type = self.schema.get('model_type', self.model_type)
+        else:
+            self.model_type = ESTIMATOR_TYPES.get(type(self.model).__name__, self.model_type)
+
+        if self.native:
+            self.enable_native()
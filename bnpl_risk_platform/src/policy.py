@@ -0,0 +1,158 @@
+import numpy as np
+from src.inference import calculate_expected_profit_batch, reject_mask, PRICING
+
+# EMV-optimal approval settings for a scored book. A loan is approved when
+# prob <= threshold, fico >= min_fico and dti <= max_dti (see
+# inference.make_decision); rejected loans contribute nothing. With the book
+# sorted by probability once, portfolio EMV at every threshold is a cumulative
+# sum, so each (min_fico, max_dti) pair costs O(n).
+
+# /settings stores integers; 0 and 999 effectively switch a rule off
+MIN_FICO_GRID = (0, 600, 620, 640, 660, 680, 700)
+MAX_DTI_GRID = (20, 25, 30, 35, 40, 45, 999)
+
+
+def loan_value(prob_default, amount, is_default=None, pricing=None):
+    """
+    Value of funding each loan. Expected profit at the model's probability, or,
+    with out-of-sample outcomes, the realized profit (the same formula at 0/1).
+    """
+    p = prob_default if is_default is None else is_default
+    return calculate_expected_profit_batch(p, amount, **(pricing or {}))
+
+
+class ThresholdSearch:
+    """The book sorted by probability once; best_threshold() is O(n) per rule mask."""
+
+    def __init__(self, prob_default, amount, is_default=None, pricing=None):
+        prob_default = np.asarray(prob_default, dtype=float)
+        if np.isnan(prob_default).any():
+            raise ValueError("prob_default contains NaN")
+        self.order = np.argsort(prob_default, kind='stable')
+        self.prob = prob_default[self.order]
+        self.value = loan_value(prob_default, amount, is_default, pricing)[self.order]
+        # `prob <= t` takes whole runs of tied probabilities, so only the last
+        # row of each run is a valid cut
+        self.cuts = np.flatnonzero(np.append(self.prob[1:] != self.prob[:-1], True))
+
+    def emv_curve(self, eligible=None):
+        """(thresholds, portfolio EMV) at every distinct probability."""
+        value = self.value if eligible is None else np.where(eligible, self.value, 0.0)
+        return self.prob[self.cuts], np.cumsum(value)[self.cuts]
+
+    def best_threshold(self, eligible=None):
+        thresholds, emv = self.emv_curve(eligible)
+        best = int(np.argmax(emv))
+        if emv[best] <= 0:
+            # Approving nobody beats every threshold
+            return {'threshold': float(np.nextafter(self.prob[0], -np.inf)), 'emv': 0.0, 'approved': 0}
+        n_cut = self.cuts[best] + 1
+        approved = n_cut if eligible is None else int(np.count_nonzero(eligible[:n_cut]))
+        return {'threshold': float(thresholds[best]), 'emv': float(emv[best]), 'approved': approved}
+
+
+def optimize_threshold(prob_default, amount, is_default=None, pricing=None):
+    """EMV-maximizing probability threshold with no FICO/DTI rules."""
+    result = ThresholdSearch(prob_default, amount, is_default, pricing).best_threshold()
+    result['approval_rate'] = result['approved'] / len(prob_default)
+    return result
+
+
+def optimize_policy(prob_default, amount, fico=None, dti=None, is_default=None, pricing=None,
+                    min_fico_grid=MIN_FICO_GRID, max_dti_grid=MAX_DTI_GRID):
+    """
+    Best threshold for every (min_fico, max_dti) pair in the grid. Returns the
+    overall best settings plus the per-pair results, highest EMV first.
+    """
+    search = ThresholdSearch(prob_default, amount, is_default, pricing)
+    n = len(search.prob)
+    fico = None if fico is None else np.asarray(fico, dtype=float)[search.order]
+    dti = None if dti is None else np.asarray(dti, dtype=float)[search.order]
+
+    grid = []
+    for min_fico in (min_fico_grid if fico is not None else [None]):
+        # Negated comparisons: a missing FICO/DTI passes, as in make_decision
+        fico_ok = ~(fico < min_fico) if fico is not None else np.ones(n, dtype=bool)
+        for max_dti in (max_dti_grid if dti is not None else [None]):
+            eligible = fico_ok & ~(dti > max_dti) if dti is not None else fico_ok
+            result = search.best_threshold(eligible)
+            result.update(min_fico=min_fico, max_dti=max_dti, approval_rate=result['approved'] / n)
+            grid.append(result)
+
+    grid.sort(key=lambda r: r['emv'], reverse=True)
+    return {**grid[0], 'grid': grid}
+
+
+def to_settings(result):
+    """The /settings payload for an optimize_policy result."""
+    settings = {'threshold': result['threshold']}
+    if result.get('min_fico') is not None:
+        settings['min_fico'] = int(result['min_fico'])
+    if result.get('max_dti') is not None:
+        settings['max_dti'] = int(result['max_dti'])
+    return settings
+
+
+class ScoredBook:
+    """
+    Historical loans with their model probabilities, scored once. simulate()
+    prices any proposed settings with masks and dot products over cached
+    per-loan columns, without calling the model again.
+    """
+
+    def __init__(self, prob_default, amount, fico=None, dti=None, is_default=None):
+        self.prob = np.asarray(prob_default, dtype=float)
+        self.amount = np.asarray(amount, dtype=float)
+        self.fico = None if fico is None else np.asarray(fico, dtype=float)
+        self.dti = None if dti is None else np.asarray(dti, dtype=float)
+        self.is_default = None if is_default is None else np.asarray(is_default, dtype=float)
+        # Per-loan terms under the default pricing, so simulate() only sums them
+        self._expected_loss = self.amount * self.prob * PRICING['lgd']
+        self._expected_profit = loan_value(self.prob, self.amount)
+        self._realized_profit = None if is_default is None else loan_value(self.prob, self.amount, self.is_default)
+
+    @classmethod
+    def from_frame(cls, df, model, target='is_default'):
+        """
+        Score a processed feature frame (data_utils.load_data output) with a
+        RiskModel, matched to the model's columns first (features.align_features).
+        """
+        from src.features import align_features
+        X = align_features(df.drop(columns=[target], errors='ignore'), model.feature_names)
+        return cls(
+            model.predict_proba(X), df['loan_amnt'].to_numpy(dtype=float),
+            fico=df['fico_range_low'].to_numpy(dtype=float), dti=df['dti'].to_numpy(dtype=float),
+            is_default=df[target].to_numpy(dtype=float) if target in df.columns else None,
+        )
+
+    def __len__(self):
+        return len(self.prob)
+
+    def simulate(self, threshold=0.15, min_fico=600, max_dti=40, pricing=None):
+        """Approval rate, funded volume, expected loss and EMV of the book under these settings."""
+        approved = ~reject_mask(self.prob, threshold, self.fico, self.dti, min_fico, max_dti)
+        weights = approved.astype(float)  # dot products beat boolean-indexed sums
+        n_approved = int(np.count_nonzero(approved))
+
+        if pricing:
+            lgd = pricing.get('lgd', PRICING['lgd'])
+            expected_loss = weights @ (self.amount * self.prob) * lgd
+            emv = weights @ loan_value(self.prob, self.amount, pricing=pricing)
+        else:
+            expected_loss = weights @ self._expected_loss
+            emv = weights @ self._expected_profit
+
+        result = {
+            'approved': n_approved,
+            'approval_rate': n_approved / len(self) if len(self) else 0.0,
+            'volume': float(weights @ self.amount),
+            'expected_loss': float(expected_loss),
+            'emv': float(emv),
+            'mean_probability': float(weights @ self.prob / n_approved) if n_approved else 0.0,
+        }
+        if self.is_default is not None:
+            realized = (weights @ loan_value(self.prob, self.amount, self.is_default, pricing)
+                        if pricing else weights @ self._realized_profit)
+            result['realized_default_rate'] = float(weights @ self.is_default / n_approved) if n_approved else 0.0
+            result['realized_profit'] = float(realized)
+        return result
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.model import RiskModel
+
+logger = logging.getLogger(__name__)
+
+# Serving knobs, read from the environment so each deployment can size them to
+# its pod. Inference workers x model threads should not exceed the CPU quota,
+# otherwise OpenMP pools oversubscribe and tail latency blows up.
+
+def serving_config(env=None):
+    env = os.environ if env is None else env
+    cpus = os.cpu_count() or 1
+    workers = int(env.get('BNPL_INFERENCE_WORKERS', min(4, cpus)))
+    return {
+        'workers': workers,
+        # Per-call thread count handed to RiskModel (n_jobs / thread_count / num_threads)
+        'model_threads': int(env.get('BNPL_MODEL_THREADS', max(1, cpus // workers))),
+        'microbatch': env.get('BNPL_MICROBATCH', '1') not in ('0', 'false', 'False'),
+        'max_batch_size': int(env.get('BNPL_BATCH_MAX_SIZE', 64)),
+        'max_wait_ms': float(env.get('BNPL_BATCH_MAX_WAIT_MS', 2.0)),
+        # /predict score cache (src.cache); a size or TTL of 0 turns it off
+        'score_cache_size': int(env.get('BNPL_SCORE_CACHE_SIZE', 100_000)),
+        'score_cache_ttl': float(env.get('BNPL_SCORE_CACHE_TTL', 30.0)),
+        # Largest batch scored with the compiled artifact; larger ones go to the pickled
+        # booster, whose per-row cost is far lower. 0 serves the pickle only
+        'compiled_max_rows': int(env.get('BNPL_COMPILED_MAX_ROWS', 32)),
+    }
+
+def make_executor(workers):
+    # Dedicated pool: model calls never queue behind Starlette's threadpool work (file I/O etc.)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row scoring requests into one predict call on
+    the inference executor. An idle batcher dispatches immediately, so a lone
+    request pays no batching delay. While batches are in flight (at most
+    `max_inflight`), new requests wait up to `max_wait_ms` for company, so
+    batch size grows with load. Rows are only batched with rows bound for the
+    same predict function, so a model swap never mixes feature layouts.
+    """
+
+    def __init__(self, executor, max_batch_size=64, max_wait_ms=2.0, max_inflight=1, metrics=None):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_inflight = max_inflight
+        self.metrics = metrics
+        self._loop = None
+        self._pending = deque()
+        self._tasks = set()
+        self._inflight = 0
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    async def submit(self, row, predict):
+        """Score one 1-D feature row with `predict` (2-D -> 1-D); resolves to its probability."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._pending.append((predict, row, future))
+        self._wakeup.set()
+        return await future
+
+    def _ensure_started(self):
+        # Bound to the running loop; restarts if the app is driven by a new one (e.g. test clients)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = deque()
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._spawn(self._collect())
+
+    def _spawn(self, coro):
+        # The loop only keeps weak references to tasks
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _collect(self):
+        while True:
+            while not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await self._slots.acquire()
+
+            # Under load, give concurrent requests a short window to join this batch
+            deadline = self._loop.time() + self.max_wait
+            while self._inflight and len(self._pending) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            predict = self._pending[0][0]
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size and self._pending[0][0] == predict:
+                _, row, future = self._pending.popleft()
+                batch.append((row, future))
+            self._inflight += 1
+            self._spawn(self._run(predict, batch))
+
+    async def _run(self, predict, batch):
+        try:
+            X = np.stack([row for row, _ in batch])
+            probs = await self._loop.run_in_executor(self.executor, predict, X)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), p in zip(batch, probs):
+                if not future.done():
+                    future.set_result(float(p))
+        finally:
+            self._inflight -= 1
+            self._slots.release()
+            if self.metrics is not None:
+                self.metrics.inc('microbatch_batches_total')
+                self.metrics.inc('microbatch_rows_total', len(batch))
+
+
+def artifact_paths(model_path):
+    """(compiled, pickle) artifacts that exist for a pickle path; either may be None."""
+    base = os.path.splitext(model_path)[0]
+    compiled = next((base + ext for ext in ['.trees', '.npz'] if os.path.exists(base + ext)), None)
+    return compiled, model_path if os.path.exists(model_path) else None
+
+
+class RoutedModel:
+    """
+    One champion behind two scorers, chosen per call by batch size. The NumPy
+    walk over the compiled trees has the lowest fixed cost, so it wins on the
+    single rows and micro-batches of /predict; its cost per row is several
+    times the booster's, so /predict/batch and /simulate go to the booster
+    (crossover for the CatBoost champion at 32-64 rows, ~6x apart at 5000).
+    """
+
+    def __init__(self, compiled=None, booster=None, compiled_max_rows=32):
+        if compiled is None and booster is None:
+            raise ValueError("No model to serve")
+        self.compiled = compiled
+        self.booster = booster
+        # With only one of the two, it scores every batch
+        if booster is None:
+            compiled_max_rows = float('inf')
+        elif compiled is None:
+            compiled_max_rows = 0
+        self.compiled_max_rows = compiled_max_rows
+        main = booster if booster is not None else compiled
+        self.model_type = main.model_type
+        self.schema = main.schema
+        self.feature_names = main.feature_names
+
+    def predict_proba(self, X):
+        model = self.compiled if len(X) <= self.compiled_max_rows else self.booster
+        return model.predict_proba(X)
+
+    def artifacts(self):
+        return {
+            'compiled': None if self.compiled is None else os.path.abspath(self.compiled.model_path),
+            'booster': None if self.booster is None else os.path.abspath(self.booster.model_path),
+            'compiled_max_rows': self.compiled_max_rows if self.booster is not None else None,
+        }
+
+
+def load_model(model_path, n_threads=None, compiled_max_rows=32):
+    """
+    RoutedModel over the artifacts of a pickle path, both in native mode. The
+    flat .trees file is memory-mapped, so uvicorn workers on one host share a
+    single copy. A compiled sibling whose tree count differs from the pickle's
+    is left over from an earlier champion (e.g. one that could not be
+    compiled) and is not served.
+    """
+    compiled_path, pickle_path = artifact_paths(model_path)
+    if compiled_max_rows <= 0:
+        compiled_path = None
+    if compiled_path is None and pickle_path is None:
+        raise FileNotFoundError(model_path)
+    booster = RiskModel(pickle_path, native=True, n_threads=n_threads) if pickle_path else None
+    compiled = RiskModel(compiled_path, native=True, n_threads=n_threads) if compiled_path else None
+    if compiled is not None and booster is not None and compiled.trees_used != booster.trees_used:
+        logger.warning("Ignoring %s: %s trees, the pickled champion has %s",
+                       compiled_path, compiled.trees_used, booster.trees_used)
+        compiled = None
+    return RoutedModel(compiled, booster, compiled_max_rows)
+
+
+class LoadedModel:
+    """A model plus everything derived from it; replaced as a unit on reload."""
+
+    def __init__(self, model, encoder, path, version):
+        self.model = model
+        self.encoder = encoder
+        self.path = path
+        self.version = version
+        self.loaded_at = time.time()
+
+    def info(self):
+        info = {
+            'path': os.path.abspath(self.path), 'version': self.version,
+            'model_type': self.model.model_type, 'loaded_at': self.loaded_at
+        }
+        if isinstance(self.model, RoutedModel):
+            info['artifacts'] = self.model.artifacts()
+        return info
+
+
+class ModelSlot:
+    """
+    Holds the model that serves requests. reload() loads and warms a replacement
+    on the calling thread while the current one keeps serving, then swaps it in
+    with a single reference assignment. Handlers read `current` once per request,
+    so in-flight requests finish on the model they started with.
+    """
+
+    def __init__(self, load, warm_up=None):
+        self._load = load  # path -> (model, encoder)
+        self._warm_up = warm_up  # (model, encoder) -> None; raises to reject the model
+        self._lock = threading.Lock()
+        self._version = 0
+        self.current = None
+
+    def reload(self, path):
+        # Serialized, so a watcher and an admin call cannot race each other
+        with self._lock:
+            model, encoder = self._load(path)
+            if self._warm_up is not None:
+                self._warm_up(model, encoder)
+            self._version += 1
+            self.current = LoadedModel(model, encoder, path, self._version)
+            return self.current
+
+
+class ArtifactWatcher(threading.Thread):
+    """
+    Polls the artifact files for a pickle path and calls `on_change` once they
+    have changed and then stayed unchanged for one more interval, so a file
+    still being written is not picked up.
+    """
+
+    def __init__(self, model_path, on_change, interval=5.0):
+        super().__init__(name='artifact-watcher', daemon=True)
+        base = os.path.splitext(model_path)[0]
+        self.paths = [model_path, base + '.trees', base + '.npz', base + '.schema.json']
+        self.on_change = on_change
+        self.interval = interval
+        self._halt = threading.Event()
+
+    def signature(self):
+        sig = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            sig.append((path, st.st_mtime_ns, st.st_size, st.st_ino))
+        return sig
+
+    def run(self):
+        seen = self.signature()
+        while not self._halt.wait(self.interval):
+            sig = self.signature()
+            if sig == seen:
+                continue
+            if self._halt.wait(self.interval):
+                break
+            if self.signature() != sig:
+                continue  # still being written; check again next round
+            seen = sig
+            try:
+                self.on_change()
+            except Exception:
+                logger.exception("Model reload after artifact change failed; keeping the current model")
+
+    def stop(self):
+        self._halt.set()
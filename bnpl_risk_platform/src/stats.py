@@ -1,42 +1,134 @@
-import pandas as pd
 import os
-from src.data_utils import load_data
-
-def get_portfolio_stats(data_path=None):
-    if data_path is None:
-        base_path = os.path.dirname(os.path.dirname(__file__))
-        data_path = os.path.join(base_path, 'data/processed/real_bnpl_features.csv')
-        
-        if not os.path.exists(data_path):
-            data_path = os.path.join(base_path, 'data/raw/LendingClub_data.csv')
-    
-    try:
-        df = pd.read_csv(data_path)
-        
-        total_transactions = len(df)
-        total_volume = df['loan_amnt'].sum() if 'loan_amnt' in df.columns else 0
-        
-        default_rate = df['is_default'].mean() if 'is_default' in df.columns else 0
-        
-        avg_fico = df['fico_range_low'].mean() if 'fico_range_low' in df.columns else 0
-        
-        approval_rate = 1 - default_rate
-        
-        risk_alerts = default_rate
-        
-        stats = {
-            'total_transactions': int(total_transactions),
-            'total_volume': float(total_volume),
+import threading
+import numpy as np
+
+# The only columns the portfolio stats need
+STATS_COLUMNS = ['loan_amnt', 'is_default', 'fico_range_low']
+
+class PortfolioAggregator:
+    """
+    Running sums behind the portfolio stats: realized outcomes from the
+    portfolio file, or, for the live book, approved applications with their
+    predicted probabilities in place of outcomes.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.volume = 0.0
+        self.default_sum = 0.0
+        self.default_count = 0
+        self.fico_sum = 0.0
+        self.fico_count = 0
+
+    @classmethod
+    def from_frame(cls, df):
+        agg = cls()
+        agg.count = len(df)
+        # Sums in float64 so float32/uint8 store columns do not lose precision
+        if 'loan_amnt' in df.columns:
+            agg.volume = float(np.nansum(df['loan_amnt'].to_numpy(dtype=np.float64)))
+        if 'is_default' in df.columns:
+            agg.default_sum = float(np.nansum(df['is_default'].to_numpy(dtype=np.float64)))
+            agg.default_count = int(df['is_default'].count())
+        if 'fico_range_low' in df.columns:
+            agg.fico_sum = float(np.nansum(df['fico_range_low'].to_numpy(dtype=np.float64)))
+            agg.fico_count = int(df['fico_range_low'].count())
+        return agg
+
+    def add(self, loan_amnt, is_default, fico=None):
+        """
+        Fold in one or more transactions. is_default may be an observed 0/1
+        outcome or a predicted probability (counted as expected defaults).
+        Books of the two kinds are reported separately, never merged.
+        """
+        loan_amnt = np.atleast_1d(np.asarray(loan_amnt, dtype=float))
+        is_default = np.atleast_1d(np.asarray(is_default, dtype=float))
+        self.count += len(loan_amnt)
+        self.volume += float(np.nansum(loan_amnt))
+        self.default_sum += float(np.nansum(is_default))
+        self.default_count += int(np.count_nonzero(~np.isnan(is_default)))
+        if fico is not None:
+            fico = np.atleast_1d(np.asarray(fico, dtype=float))
+            self.fico_sum += float(np.nansum(fico))
+            self.fico_count += int(np.count_nonzero(~np.isnan(fico)))
+        return self
+
+    def to_stats(self):
+        default_rate = self.default_sum / self.default_count if self.default_count else 0
+        avg_fico = self.fico_sum / self.fico_count if self.fico_count else 0
+        return {
+            'total_transactions': int(self.count),
+            'total_volume': float(self.volume),
             'default_rate': float(default_rate),
-            'approval_rate': float(approval_rate),
+            'approval_rate': float(1 - default_rate),
             'avg_fico': int(avg_fico),
-            'risk_alerts': float(risk_alerts)
+            'risk_alerts': float(default_rate)
         }
-        
-        return stats
-        
-    except Exception as e:
+
+    def to_live_stats(self):
+        expected_rate = self.default_sum / self.default_count if self.default_count else 0
         return {
+            'live_transactions': int(self.count),
+            'live_volume': float(self.volume),
+            'expected_default_rate': float(expected_rate),
+            # Each API worker keeps its own live book; totals across workers are not pooled
+            'live_worker_pid': os.getpid(),
+        }
+
+
+# path -> ((mtime, size), aggregator); recomputed only when the file changes
+_file_cache = {}
+_cache_lock = threading.Lock()
+
+# Applications this process approved since startup, at their predicted
+# probabilities; reported next to the realized file totals, not mixed into them
+live_book = PortfolioAggregator()
+_live_lock = threading.Lock()
+
+def record_transactions(loan_amnt, prob_default, fico=None, approved=None):
+    """Fold scored applications into the live book; with `approved`, only the approved ones."""
+    if approved is not None:
+        approved = np.atleast_1d(np.asarray(approved, dtype=bool))
+        if not approved.any():
+            return
+        loan_amnt = np.atleast_1d(loan_amnt)[approved]
+        prob_default = np.atleast_1d(prob_default)[approved]
+        fico = np.atleast_1d(fico)[approved] if fico is not None else None
+    with _live_lock:
+        live_book.add(loan_amnt, prob_default, fico)
+
+def _file_aggregator(data_path):
+    st = os.stat(data_path)
+    signature = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        cached = _file_cache.get(data_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    # Imported here rather than at module level so the API can start (and
+    # score) without pandas
+    from src.data_utils import load_data, available_columns
+    columns = [c for c in STATS_COLUMNS if c in available_columns(data_path)]
+    agg = PortfolioAggregator.from_frame(load_data(data_path, columns=columns))
+
+    with _cache_lock:
+        _file_cache[data_path] = (signature, agg)
+    return agg
+
+def get_portfolio_stats(data_path=None, include_live=True):
+    try:
+        if data_path is None:
+            from src.data_utils import find_features_file
+            base_path = os.path.dirname(os.path.dirname(__file__))
+            data_path = find_features_file(base_path)
+
+            if not os.path.exists(data_path):
+                data_path = os.path.join(base_path, 'data/raw/LendingClub_data.csv')
+
+        stats = _file_aggregator(data_path).to_stats()
+
+    except Exception as e:
+        stats = {
             'total_transactions': 0,
             'total_volume': 0.0,
             'default_rate': 0.0,
@@ -45,3 +137,8 @@ def get_portfolio_stats(data_path=None):
             'risk_alerts': 0.0,
             'error': str(e)
         }
+
+    if include_live:
+        with _live_lock:
+            stats.update(live_book.to_live_stats())
+    return stats
@@ -0,0 +1,236 @@
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from src.model import RiskModel, DEFAULT_PARAMS, replace_atomically
+from src.data_utils import share_frames, map_frames
+
+# Successive halving over a parameter grid per model_type. Every configuration
+# starts on a small budget (trees, or a share of the training rows for logreg);
+# after each rung only the best 1/eta by validation AUC go on to eta times the
+# budget, and the last survivor gets the full budget. Boosters also early-stop
+# inside a trial, so the budget is a ceiling. All trials share one process pool,
+# each capped to its share of the CPUs, and a model type's next rung starts as
+# soon as its own rung is done.
+
+SEARCH_SPACES = {
+    'lightgbm': {
+        'resource': 'n_estimators', 'min_budget': 30, 'max_budget': 810,
+        'grid': {'num_leaves': [15, 31, 63, 127], 'learning_rate': [0.05, 0.1], 'min_child_samples': [20, 100]},
+    },
+    'xgboost': {
+        'resource': 'n_estimators', 'min_budget': 30, 'max_budget': 810,
+        'grid': {'max_depth': [3, 6, 8], 'learning_rate': [0.05, 0.1, 0.3], 'min_child_weight': [1, 10]},
+    },
+    'catboost': {
+        'resource': 'n_estimators', 'min_budget': 30, 'max_budget': 810,
+        'grid': {'depth': [4, 6, 8], 'learning_rate': [0.05, 0.1], 'l2_leaf_reg': [1, 3, 10]},
+    },
+    'rf': {
+        'resource': 'n_estimators', 'min_budget': 20, 'max_budget': 180,
+        'grid': {'max_depth': [6, 10, 16, None], 'min_samples_leaf': [1, 10, 50], 'max_features': ['sqrt', 0.5]},
+    },
+    'logreg': {
+        # Budget is the share of training rows; lbfgs has no rounds to cut short
+        'resource': 'rows', 'min_budget': 1 / 9, 'max_budget': 1.0,
+        'grid': {'C': [0.01, 0.1, 1.0, 10.0]},
+    },
+}
+
+# Set per worker process by the pool initializer: views over the training split,
+# memory-mapped from files written once (data_utils.share_frames), so workers
+# share its pages instead of each holding a copy
+_data = {}
+
+def _init_worker(spec, n_fit):
+    shared = map_frames(spec)
+    X, y = shared['X'], shared['y']
+    _data.update(X_fit=X.iloc[:n_fit], y_fit=y.iloc[:n_fit], X_val=X.iloc[n_fit:], y_val=y.iloc[n_fit:])
+
+
+def grid_configs(grid, max_configs=None, seed=42):
+    """Every combination of the grid, or a seeded random sample of `max_configs` of them."""
+    names = list(grid)
+    configs = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    if max_configs is not None and max_configs < len(configs):
+        keep = np.random.default_rng(seed).choice(len(configs), size=max_configs, replace=False)
+        configs = [configs[i] for i in sorted(keep)]
+    return configs
+
+
+def run_trial(m_type, config, budget, n_threads, early_stopping_rounds):
+    """Fit one configuration on one budget inside a worker and score it on the validation rows."""
+    from threadpoolctl import threadpool_limits
+    from sklearn.metrics import roc_auc_score
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    space = SEARCH_SPACES[m_type]
+    params = dict(DEFAULT_PARAMS[m_type], **config)
+    X, y = _data['X_fit'], _data['y_fit']
+    if space['resource'] == 'rows':
+        n = max(1, int(round(len(X) * budget / space['max_budget'])))
+        X, y = X.iloc[:n], y.iloc[:n]
+    else:
+        params[space['resource']] = budget
+    if m_type == 'catboost':
+        # Concurrent trials would all write to the same catboost_info directory
+        params['allow_writing_files'] = False
+
+    with threadpool_limits(limits=n_threads):
+        model = RiskModel(model_type=m_type, n_threads=n_threads)
+        model.train(X, y, X_val=_data['X_val'], y_val=_data['y_val'], params=params,
+                    early_stopping_rounds=early_stopping_rounds)
+        auc = roc_auc_score(_data['y_val'], model.predict_proba(_data['X_val']))
+
+    trees = model.trees_used
+    return {
+        'model': m_type,
+        'params': config,
+        'budget': budget,
+        'auc': float(auc),
+        'trees_used': int(trees) if trees is not None else None,
+        'wall_time_s': time.perf_counter() - wall_start,
+        'cpu_time_s': time.process_time() - cpu_start,
+    }
+
+
+class _Bracket:
+    """Successive-halving state of one model type: the current rung's configs and results."""
+
+    def __init__(self, m_type, configs, eta):
+        self.m_type = m_type
+        self.space = SEARCH_SPACES[m_type]
+        self.eta = eta
+        self.configs = configs
+        self.budget = self.space['min_budget']
+        self.rung_results = []
+        self.trials = []
+        self.rungs = []
+        self.started = time.perf_counter()
+        self.finished = None
+        self.best = None
+        self.error = None
+
+    def record(self, trial):
+        trial['rung'] = len(self.rungs)
+        self.rung_results.append(trial)
+        self.trials.append(trial)
+        return len(self.rung_results) == len(self.configs)
+
+    def advance(self):
+        """Close the rung; return the next rung's configs, or None when the search is done."""
+        ranked = sorted(self.rung_results, key=lambda t: t['auc'], reverse=True)
+        self.rungs.append({'budget': self.budget, 'configs': len(ranked), 'best_auc': ranked[0]['auc']})
+        self.rung_results = []
+        if self.budget >= self.space['max_budget']:
+            self.best = ranked[0]
+            self.finished = time.perf_counter()
+            return None
+        self.configs = [t['params'] for t in ranked[:max(1, len(ranked) // self.eta)]]
+        # A lone survivor has nothing left to compete with; give it the full budget
+        if len(self.configs) == 1:
+            self.budget = self.space['max_budget']
+        else:
+            self.budget = min(self.budget * self.eta, self.space['max_budget'])
+        return self.configs
+
+    def summary(self):
+        if self.error is not None:
+            return {'error': self.error, 'trials': self.trials}
+        best_params = dict(self.best['params'])
+        if self.space['resource'] != 'rows' and self.best['trees_used'] is not None:
+            # Trees the winner kept after early stopping, so a refit needs no validation set
+            best_params[self.space['resource']] = self.best['trees_used']
+        return {
+            'best_params': best_params,
+            'best_auc': self.best['auc'],
+            'resource': self.space['resource'],
+            'rungs': self.rungs,
+            'wall_time_s': self.finished - self.started,
+            'cpu_time_s': sum(t['cpu_time_s'] for t in self.trials),
+            'trials': self.trials,
+        }
+
+
+def successive_halving(X_train, y_train, model_types=None, val_size=0.2, eta=3, early_stopping_rounds=20,
+                       workers=None, n_threads=None, max_configs=None, seed=42, log=print):
+    """
+    Tune every model type in `model_types` on X_train. The last `val_size` of
+    the rows is the validation set for early stopping and ranking, so the rows
+    must already be shuffled (as load_training_split returns them). Workers
+    memory-map one copy of X_train, at its own dtypes, so memory does not
+    grow with `workers`. Returns the results dict save_results() writes.
+    """
+    model_types = list(model_types or SEARCH_SPACES)
+    unknown = [m for m in model_types if m not in SEARCH_SPACES]
+    if unknown:
+        raise ValueError(f"No search space for: {unknown}")
+
+    n_fit = int(len(X_train) * (1 - val_size))
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    n_threads = n_threads or max(1, (os.cpu_count() or 1) // workers)
+    brackets = {m: _Bracket(m, grid_configs(SEARCH_SPACES[m]['grid'], max_configs, seed), eta) for m in model_types}
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker,
+        initargs=(share_frames(tmp, X=X_train, y=y_train), n_fit)
+    ) as pool:
+        def submit(bracket):
+            log(f"  {bracket.m_type}: rung {len(bracket.rungs)}, {len(bracket.configs)} configs "
+                f"at {bracket.space['resource']}={bracket.budget:.4g}")
+            return {pool.submit(run_trial, bracket.m_type, config, bracket.budget, n_threads,
+                                early_stopping_rounds): bracket for config in bracket.configs}
+
+        pending = {}
+        for bracket in brackets.values():
+            pending.update(submit(bracket))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                bracket = pending.pop(future)
+                if bracket.error is not None:
+                    continue
+                try:
+                    trial = future.result()
+                except Exception as e:
+                    # Drop this model type; the others keep searching
+                    bracket.error = repr(e)
+                    log(f"  {bracket.m_type} failed: {e}")
+                    continue
+                if bracket.record(trial) and bracket.advance() is not None:
+                    pending.update(submit(bracket))
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rows': {'fit': n_fit, 'val': len(X_train) - n_fit},
+        'eta': eta,
+        'early_stopping_rounds': early_stopping_rounds,
+        'workers': workers,
+        'threads_per_trial': n_threads,
+        'wall_time_s': time.perf_counter() - start,
+        'models': {m: bracket.summary() for m, bracket in brackets.items()},
+    }
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(results, f, indent=2)
+    replace_atomically(path, write)
+
+
+def load_best_params(path):
+    """model_type -> full training params (DEFAULT_PARAMS with the tuned values on top)."""
+    with open(path) as f:
+        results = json.load(f)
+    return {m: dict(DEFAULT_PARAMS[m], **r['best_params'])
+            for m, r in results['models'].items() if 'best_params' in r}
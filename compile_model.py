@@ -0,0 +1,40 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.model import RiskModel
+from src.features import load_feature_schema
+
+TOLERANCE = 1e-6
+
+model_path = sys.argv[1] if len(sys.argv) > 1 else 'bnpl_risk_platform/models/champion_model.pkl'
+feature_schema_path = sys.argv[2] if len(sys.argv) > 2 else None
+base_path = os.path.splitext(model_path)[0]
+
+print(f"Loading {model_path}...")
+model = RiskModel(model_path)
+if feature_schema_path:
+    # Training-time medians and vocabularies (process_data_script.py's feature_schema.json),
+    # for artifacts trained without them; the sidecar is shared by .pkl, .npz and .trees
+    feature_schema = load_feature_schema(feature_schema_path)
+    model.schema.update(medians=feature_schema['medians'], categories=feature_schema['categories'])
+    print(f"Merged feature schema from {feature_schema_path}")
+compiled = model.compile()
+print(f"Compiled {model.model_type}: {compiled.n_trees} trees, {len(compiled.feature)} nodes, max depth {compiled.max_depth}")
+
+# Parity check on random inputs in the model's feature layout
+rng = np.random.default_rng(42)
+n_features = len(model.feature_names)
+X = rng.normal(0, 1, (5000, n_features)).astype(np.float32) * rng.choice([1, 10, 1000], n_features).astype(np.float32)
+diff = np.abs(compiled.predict_proba(X)[:, 1] - model.predict_proba(X)).max()
+print(f"Max abs diff vs original: {diff:.2e}")
+if diff > TOLERANCE:
+    print("Compiled model does not match, not saving.")
+    sys.exit(1)
+
+# .npz for portability, .trees for memory-mapped serving (preferred by the API)
+model.save(base_path + '.npz')
+model.save(base_path + '.trees')
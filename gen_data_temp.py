@@ -1,79 +1,257 @@
-import pandas as pd
-import numpy as np
-import random
-from datetime import datetime, timedelta
+import sys
 import os
+import io
+import time
+import argparse
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.features import VALID_STATUS, BAD_INDICATORS
+from src.encoder import CATEGORIES
+
+# Seeded synthetic data at any scale. Every column is drawn as a whole array
+# and user attributes are joined onto transactions by integer index, so cost is
+# O(rows). Rows are produced in fixed-size chunks, each with its own seed
+# spawned from --seed, so the output depends only on --seed, --rows and
+# --chunk-rows, not on --workers. Memory is bounded by the chunks in flight.
+
+MERCHANT_CATEGORIES = ['Electronics', 'Fashion', 'Home', 'Beauty', 'Sports', 'Groceries']
+EMPLOYMENT_STATUS = ['Employed', 'Self-Employed', 'Unemployed', 'Student']
+EMPLOYMENT_MIX = [0.6, 0.2, 0.05, 0.15]
+
+GOOD_STATUS = [s for s in VALID_STATUS if s not in BAD_INDICATORS]
+
+DEFAULT_OUTPUT = {
+    'bnpl': 'bnpl_risk_platform/data/raw/synthetic_bnpl_data.csv',
+    'lendingclub': 'bnpl_risk_platform/data/raw/synthetic_lendingclub_data.csv',
+}
+
+def generate_users(n, rng):
+    credit_score = np.clip(rng.normal(650, 100, n).astype(int), 300, 850)
+    return pd.DataFrame({
+        'user_id': _ids('U', 0, n, 5),
+        'age': rng.integers(18, 70, n),
+        'annual_income': np.round(rng.normal(50000, 15000, n), 2),
+        'employment_status': rng.choice(EMPLOYMENT_STATUS, n, p=EMPLOYMENT_MIX),
+        'credit_score_external': credit_score,
+    })
+
+def generate_transactions(users_df, n_txn, rng, start=0, end_date=None):
+    """
+    Transactions joined with their user's attributes (the old loop's output
+    after the merge). `start` offsets the transaction ids for chunked runs.
+    """
+    end_date = end_date or date.today()
+    users = rng.integers(0, len(users_df), n_txn)  # row index into users_df
+    category = rng.integers(0, len(MERCHANT_CATEGORIES), n_txn)
+    amount = np.clip(rng.exponential(150, n_txn), 10, 2000)
+    days = rng.integers(0, 365, n_txn)
+
+    credit_score = users_df['credit_score_external'].to_numpy()[users]
+    base_prob = (0.05 + 0.2 * (credit_score < 500)
+                 + 0.05 * (category == MERCHANT_CATEGORIES.index('Electronics'))
+                 + 0.1 * (amount > 500))
+    is_default = (rng.random(n_txn) < base_prob).astype(int)
+
+    txn = pd.DataFrame({
+        'transaction_id': _ids('TXN', start, n_txn, 6),
+        'user_id': users_df['user_id'].to_numpy()[users],
+        'transaction_date': np.datetime64(end_date - timedelta(days=365), 'D') + days,
+        'amount': np.round(amount, 2),
+        'merchant_category': np.array(MERCHANT_CATEGORIES, dtype=object)[category],
+        'is_default': is_default,
+    })
+    for col in users_df.columns.drop('user_id'):
+        txn[col] = users_df[col].to_numpy()[users]
+    return txn
+
+def make_lendingclub_raw(n, seed=42):
+    """
+    Raw LendingClub-schema rows in the shape create_features expects: string
+    int_rate/revol_util/term, the four categorical columns and a finalized
+    loan_status. Defaults depend on grade, FICO, DTI and term, so models
+    trained on it have signal to find. `seed` may be an int or a SeedSequence.
+    """
+    rng = np.random.default_rng(seed)
+    grade = rng.choice(len(CATEGORIES['grade']), n, p=[0.17, 0.29, 0.28, 0.15, 0.07, 0.03, 0.01])
+    int_rate = np.round(np.clip(6 + 3.5 * grade + rng.normal(0, 1.5, n), 5, 30), 2)
+    term_months = np.where(rng.random(n) < 0.25, 60, 36)
+    loan_amnt = rng.integers(1000, 40000, n).astype(float)
+    r = int_rate / 1200
+    fico = rng.integers(600, 850, n).astype(float)
+    dti = rng.uniform(0, 40, n)
+
+    logit = -2.4 + 0.35 * grade - 0.008 * (fico - 700) + 0.03 * (dti - 18) + 0.4 * (term_months == 60)
+    defaulted = rng.random(n) < 1 / (1 + np.exp(-logit))
+    status = np.where(
+        defaulted,
+        np.array(BAD_INDICATORS, dtype=object)[rng.integers(0, len(BAD_INDICATORS), n)],
+        np.array(GOOD_STATUS, dtype=object)[rng.integers(0, len(GOOD_STATUS), n)],
+    )
+
+    return pd.DataFrame({
+        'loan_amnt': loan_amnt,
+        'int_rate': _percent_strings(int_rate, 2),
+        'installment': np.round(loan_amnt * r / (1 - (1 + r) ** -term_months), 2),
+        'annual_inc': rng.lognormal(11, 0.5, n),
+        'dti': dti,
+        'fico_range_low': fico,
+        'revol_util': _percent_strings(rng.uniform(0, 100, n), 1),
+        'total_acc': rng.integers(2, 60, n).astype(float),
+        'open_acc': rng.integers(1, 30, n).astype(float),
+        'pub_rec': rng.integers(0, 3, n).astype(float),
+        'term': np.where(term_months == 60, ' 60 months', ' 36 months').astype(object),
+        'grade': np.array(CATEGORIES['grade'], dtype=object)[grade],
+        'home_ownership': rng.choice(np.array(CATEGORIES['home_ownership'][:3], dtype=object), n),
+        'verification_status': rng.choice(np.array(CATEGORIES['verification_status'], dtype=object), n),
+        'purpose': rng.choice(np.array(CATEGORIES['purpose'], dtype=object), n),
+        'loan_status': status,
+    })
+
+def _ids(prefix, start, n, width):
+    # 'TXN000042'-style ids without a per-row format call
+    digits = np.arange(start, start + n).astype(str)
+    return np.char.add(prefix, np.char.zfill(digits, width)).astype(object)
+
+def _percent_strings(values, decimals):
+    # '12.34%' strings: format each grid value once, then index
+    scale = 10 ** decimals
+    codes = np.round(np.asarray(values) * scale).astype(np.int64)
+    low = int(codes.min()) if len(codes) else 0
+    table = np.array([f'{c / scale:.{decimals}f}%' for c in range(low, int(codes.max(initial=low)) + 1)], dtype=object)
+    return table[codes - low]
+
+
+# Chunked writing. Workers build and serialize a chunk (CSV bytes or an Arrow
+# table); the parent only appends them in order.
+
+_users_cache = {}
+
+def _users(n_users, seed_seq):
+    key = (n_users, seed_seq.entropy, seed_seq.spawn_key)
+    if key not in _users_cache:
+        _users_cache.clear()
+        _users_cache[key] = generate_users(n_users, np.random.default_rng(seed_seq))
+    return _users_cache[key]
+
+def build_chunk(task):
+    mode, fmt, start, n, chunk_seq, n_users, users_seq, end_date = task
+    if mode == 'lendingclub':
+        df = make_lendingclub_raw(n, chunk_seq)
+    else:
+        df = generate_transactions(_users(n_users, users_seq), n, np.random.default_rng(chunk_seq), start, end_date)
+    try:
+        table = _to_arrow(df)
+    except ImportError:
+        if fmt == '.parquet':
+            raise
+        return n, df.to_csv(index=False, header=start == 0).encode()
+    if fmt == '.parquet':
+        return n, table
+    # pyarrow's CSV writer is ~8x faster than DataFrame.to_csv
+    import pyarrow.csv as pa_csv
+    buf = io.BytesIO()
+    pa_csv.write_csv(table, buf, pa_csv.WriteOptions(include_header=start == 0))
+    return n, buf.getvalue()
+
+def _to_arrow(df):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Calendar dates stay dates ('2025-10-24'), not midnight timestamps
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+    return table
+
+def chunk_tasks(mode, fmt, rows, chunk_rows, seed, n_users, end_date):
+    users_seq, txn_seq = np.random.SeedSequence(seed).spawn(2)
+    n_chunks = -(-rows // chunk_rows)
+    for i, chunk_seq in enumerate(txn_seq.spawn(n_chunks)):
+        start = i * chunk_rows
+        yield (mode, fmt, start, min(chunk_rows, rows - start), chunk_seq, n_users, users_seq, end_date)
+
+def write_dataset(output, mode='bnpl', rows=50_000, chunk_rows=1_000_000, seed=42, users=5000,
+                  workers=1, end_date=None):
+    """Generate `rows` rows into a CSV or Parquet file; returns rows written."""
+    fmt = os.path.splitext(output)[1]
+    if fmt not in ('.csv', '.parquet'):
+        raise ValueError(f"Unsupported output format: {fmt}")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    tasks = chunk_tasks(mode, fmt, rows, chunk_rows, seed, users, end_date or date.today())
+
+    tmp_path = output + '.tmp'
+    writer = None
+    written = 0
+    start_time = time.perf_counter()
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        with open(tmp_path, 'wb') if fmt == '.csv' else nullcontext() as f:
+            def emit(result):
+                nonlocal writer, written
+                n, chunk = result
+                if fmt == '.csv':
+                    f.write(chunk)
+                else:
+                    import pyarrow.parquet as pq
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, chunk.schema)
+                    writer.write_table(chunk.cast(writer.schema))
+                written += n
+                rate = written / max(time.perf_counter() - start_time, 1e-9)
+                print(f"  {written:,} rows ({rate:,.0f} rows/s)", end="\r", flush=True)
+
+            if executor is None:
+                for task in tasks:
+                    emit(build_chunk(task))
+            else:
+                # At most 2 chunks per worker in flight, written in submission order
+                inflight = deque()
+                for task in tasks:
+                    inflight.append(executor.submit(build_chunk, task))
+                    if len(inflight) >= 2 * workers:
+                        emit(inflight.popleft().result())
+                while inflight:
+                    emit(inflight.popleft().result())
+        if writer is not None:
+            writer.close()
+            writer = None
+        os.replace(tmp_path, output)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic BNPL or LendingClub-schema data")
+    parser.add_argument('--mode', choices=['bnpl', 'lendingclub'], default='bnpl',
+                        help="bnpl: transactions joined with users; lendingclub: raw rows for process_data_script.py")
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--users', type=int, default=5000, help="Distinct users (bnpl mode)")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=1, help="Processes generating chunks")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                        help="Last day of the transaction window (default today); pin it for byte-identical runs")
+    parser.add_argument('--output', default=None, help="CSV or .parquet path")
+    args = parser.parse_args()
+
+    output = args.output or DEFAULT_OUTPUT[args.mode]
+    print(f"Generating {args.rows:,} {args.mode} rows in chunks of {args.chunk_rows:,} ({args.workers} workers)...")
+    start = time.perf_counter()
+    rows = write_dataset(output, args.mode, args.rows, args.chunk_rows, args.seed, args.users,
+                         args.workers, args.end_date)
+    print(f"Data saved to {output}: {rows:,} rows in {time.perf_counter() - start:.1f}s")
 
-np.random.seed(42)
-random.seed(42)
-
-NUM_USERS = 5000
-NUM_TRANSACTIONS = 50000
-
-def generate_users(n):
-    users = []
-    for i in range(n):
-        uid = f'U{i:05d}'
-        age = np.random.randint(18, 70)
-        income = np.random.normal(50000, 15000)
-        employment_status = np.random.choice(['Employed', 'Self-Employed', 'Unemployed', 'Student'], p=[0.6, 0.2, 0.05, 0.15])
-        credit_score_proxy = int(np.random.normal(650, 100))
-        credit_score_proxy = max(300, min(850, credit_score_proxy))
-        
-        users.append({
-            'user_id': uid,
-            'age': age,
-            'annual_income': round(income, 2),
-            'employment_status': employment_status,
-            'credit_score_external': credit_score_proxy
-        })
-    return pd.DataFrame(users)
-
-def generate_transactions(users_df, n_txn):
-    user_ids = users_df['user_id'].values
-    merchant_categories = ['Electronics', 'Fashion', 'Home', 'Beauty', 'Sports', 'Groceries']
-    
-    transactions = []
-    start_date = datetime.now() - timedelta(days=365)
-    
-    for i in range(n_txn):
-        tid = f'TXN{i:06d}'
-        uid = np.random.choice(user_ids)
-        category = np.random.choice(merchant_categories)
-        amount = np.random.exponential(150)
-        amount = max(10, min(2000, amount))
-        
-        txn_date = start_date + timedelta(days=np.random.randint(0, 365))
-        
-        is_default = 0
-        user_risk = users_df.loc[users_df['user_id'] == uid, 'credit_score_external'].values[0]
-        
-        base_prob = 0.05
-        if user_risk < 500: base_prob += 0.2
-        if category == 'Electronics': base_prob += 0.05
-        if amount > 500: base_prob += 0.1
-        
-        if np.random.random() < base_prob:
-            is_default = 1
-            
-        transactions.append({
-            'transaction_id': tid,
-            'user_id': uid,
-            'transaction_date': txn_date,
-            'amount': round(amount, 2),
-            'merchant_category': category,
-            'is_default': is_default
-        })
-        
-    return pd.DataFrame(transactions)
-
-print("Generating users...")
-users_df = generate_users(NUM_USERS)
-print("Generating transactions...")
-txn_df = generate_transactions(users_df, NUM_TRANSACTIONS)
-transactions_df = txn_df.merge(users_df, on='user_id', how='left')
-
-output_path = 'bnpl_risk_platform/data/raw/synthetic_bnpl_data.csv'
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-transactions_df.to_csv(output_path, index=False)
-print(f"Data saved to {output_path}")
+if __name__ == "__main__":
+    main()
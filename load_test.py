@@ -0,0 +1,323 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from collections import Counter
+import numpy as np
+import httpx
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.data_utils import clean_percent_col, parse_term_months
+from src.metrics import Histogram, DEFAULT_BUCKETS
+from gen_data_temp import make_lendingclub_raw
+
+# Load generator for the scoring API. Open-loop mode sends at a fixed (or
+# Poisson) arrival rate regardless of how fast responses come back, and times
+# each request from its scheduled send, so a stalled server shows up as
+# latency instead of as a politely slowed-down client. Closed-loop mode keeps
+# N requests outstanding. The client shares the machine's CPUs with the
+# server, so watch the reported send lag: if it grows, the client is the
+# bottleneck, not the API.
+
+APP_DIR = os.path.abspath('bnpl_risk_platform/app')
+
+REQUEST_FIELDS = [
+    'loan_amnt', 'int_rate', 'installment', 'annual_inc', 'dti', 'fico_range_low', 'revol_util',
+    'total_acc', 'open_acc', 'pub_rec', 'term_months', 'grade', 'home_ownership', 'verification_status', 'purpose'
+]
+
+def synthetic_payloads(n, seed=42):
+    """TransactionRequest bodies built from synthetic LendingClub rows."""
+    raw = make_lendingclub_raw(n, seed)
+    raw['int_rate'] = clean_percent_col(raw['int_rate'])
+    raw['revol_util'] = clean_percent_col(raw['revol_util'])
+    raw['term_months'] = parse_term_months(raw['term'])
+    return raw[REQUEST_FIELDS].to_dict('records')
+
+def load_payloads(path):
+    # A JSON list of request bodies, or one body per line (e.g. captured from logs)
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.send_lag = []
+        self.statuses = Counter()
+        self.dropped = 0
+        self.first_send = None
+        self.last_done = None
+
+    def record(self, scheduled, sent, done, status):
+        self.latencies.append(done - scheduled)
+        self.send_lag.append(sent - scheduled)
+        self.statuses[status] += 1
+        self.first_send = scheduled if self.first_send is None else min(self.first_send, scheduled)
+        self.last_done = done if self.last_done is None else max(self.last_done, done)
+
+    def summary(self, target_rate=None):
+        lat = np.array(self.latencies) * 1e3
+        ok = self.statuses.get(200, 0)
+        total = sum(self.statuses.values()) + self.dropped
+        elapsed = (self.last_done - self.first_send) if lat.size else 0.0
+        result = {
+            'requests': total,
+            'ok': ok,
+            'errors': total - ok,
+            'error_rate': (total - ok) / total if total else 0.0,
+            'statuses': {str(k): v for k, v in self.statuses.items()},
+            'dropped': self.dropped,
+            'throughput_rps': ok / elapsed if elapsed else 0.0,
+            'send_lag_p99_ms': float(np.percentile(self.send_lag, 99) * 1e3) if lat.size else 0.0,
+        }
+        if target_rate is not None:
+            result['target_rps'] = target_rate
+        if lat.size:
+            result.update({
+                'p50_ms': float(np.percentile(lat, 50)), 'p95_ms': float(np.percentile(lat, 95)),
+                'p99_ms': float(np.percentile(lat, 99)), 'max_ms': float(lat.max()), 'mean_ms': float(lat.mean()),
+            })
+        hist = Histogram(DEFAULT_BUCKETS)
+        for value in self.latencies:
+            hist.observe(value)
+        result['histogram'] = {
+            (f'le_{bound * 1e3:g}ms' if i < len(hist.bounds) else 'inf'): count
+            for i, (bound, count) in enumerate(zip(hist.bounds + [float('inf')], hist.counts)) if count
+        }
+        return result
+
+
+async def _send(client, path, body, scheduled, rec):
+    sent = time.perf_counter()
+    try:
+        status = (await client.post(path, json=body)).status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    rec.record(scheduled, sent, time.perf_counter(), status)
+
+def _bodies(payloads, batch_size):
+    # Endless stream of request bodies: single payloads, or lists for /predict/batch
+    i = 0
+    while True:
+        if batch_size > 1:
+            yield [payloads[(i + k) % len(payloads)] for k in range(batch_size)]
+            i += batch_size
+        else:
+            yield payloads[i % len(payloads)]
+            i += 1
+
+async def open_loop(client, path, payloads, rate, duration, batch_size=1, max_outstanding=1000,
+                    poisson=False, seed=0):
+    """Send at `rate` requests/s for `duration` seconds, whatever the response times."""
+    rec = Recorder()
+    rng = np.random.default_rng(seed)
+    bodies = _bodies(payloads, batch_size)
+    tasks = set()
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled < start + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_outstanding:
+            rec.dropped += 1  # counted as an error rather than queued client-side
+        else:
+            task = asyncio.create_task(_send(client, path, next(bodies), scheduled, rec))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        scheduled += rng.exponential(1 / rate) if poisson else 1 / rate
+    if tasks:
+        await asyncio.wait(tasks)
+    result = rec.summary(target_rate=rate)
+    # What was actually offered; with --poisson it varies around the target
+    result['offered_rps'] = result['requests'] / duration
+    return result
+
+async def closed_loop(client, path, payloads, concurrency, duration, batch_size=1):
+    """`concurrency` workers, each sending its next request as soon as the last one returns."""
+    rec = Recorder()
+    bodies = _bodies(payloads, batch_size)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await _send(client, path, next(bodies), time.perf_counter(), rec)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    result = rec.summary()
+    result['concurrency'] = concurrency
+    return result
+
+def _passes(result, slo_ms, max_error_rate):
+    return (result['throughput_rps'] >= 0.95 * result['offered_rps']
+            and result.get('p99_ms', float('inf')) <= slo_ms
+            and result['error_rate'] <= max_error_rate)
+
+async def find_saturation(client, path, payloads, start_rate, duration, slo_ms=100.0, max_error_rate=0.01,
+                          growth=1.5, refine=3, max_rate=1e6, **kwargs):
+    """
+    Highest open-loop rate the API sustains: throughput within 5% of the
+    offered rate, p99 under the SLO and errors under the limit. Rates grow
+    geometrically until a step fails, then bisect between the last pass (0
+    if the first step failed) and the first failure. If no step has passed
+    by then, the failing rate keeps halving until one does.
+    """
+    steps = []
+
+    async def step(rate):
+        result = await open_loop(client, path, payloads, rate, duration, **kwargs)
+        result['passed'] = _passes(result, slo_ms, max_error_rate)
+        steps.append(result)
+        print(_format(f"{rate:,.0f} rps", result) + ('' if result['passed'] else '  FAIL'))
+        return result['passed']
+
+    good, bad = None, None
+    rate = start_rate
+    while rate <= max_rate:
+        if not await step(rate):
+            bad = rate
+            break
+        good = rate
+        rate *= growth
+    for _ in range(refine if bad else 0):
+        mid = ((good or 0.0) + bad) / 2
+        if await step(mid):
+            good = mid
+        else:
+            bad = mid
+    while bad and good is None and bad / 2 >= 1.0:
+        if await step(bad / 2):
+            good = bad / 2
+        else:
+            bad /= 2
+
+    passing = [s for s in steps if s['passed']]
+    return {
+        'saturation_rps': good,
+        'first_failing_rps': bad,
+        'max_throughput_rps': max((s['throughput_rps'] for s in steps), default=0.0),
+        'slo_p99_ms': slo_ms,
+        'at_saturation': max(passing, key=lambda s: s['target_rps']) if passing else None,
+        'steps': steps,
+    }
+
+def _format(label, r):
+    return (f"  {label:>14}: {r['throughput_rps']:8,.0f} ok/s  p50 {r.get('p50_ms', 0):7.2f}ms  "
+            f"p95 {r.get('p95_ms', 0):7.2f}ms  p99 {r.get('p99_ms', 0):7.2f}ms  max {r.get('max_ms', 0):7.1f}ms  "
+            f"err {r['error_rate']:.2%}  lag p99 {r['send_lag_p99_ms']:.1f}ms")
+
+
+def start_server(port, workers, env=None):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(port), '--workers', str(workers),
+         '--log-level', 'warning'],
+        cwd=APP_DIR, env={**os.environ, **(env or {})}
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(url + '/', timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not come up within 120s")
+
+async def run(args, payloads, url):
+    limits = httpx.Limits(max_connections=args.max_outstanding, max_keepalive_connections=args.max_outstanding)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        common = {'batch_size': args.batch_size}
+        if args.warmup:
+            await closed_loop(client, args.path, payloads, 4, args.warmup, **common)
+
+        if args.find_saturation:
+            print(f"Searching for the saturation point (p99 SLO {args.slo_ms:g}ms)...")
+            result = await find_saturation(
+                client, args.path, payloads, args.start_rate, args.duration, slo_ms=args.slo_ms,
+                max_error_rate=args.max_error_rate, growth=args.growth, refine=args.refine,
+                max_outstanding=args.max_outstanding, poisson=args.poisson, **common
+            )
+            if result['saturation_rps'] is None:
+                print(f"No rate down to {result['first_failing_rps'] or 0:,.1f} rps met the SLO "
+                      f"(max throughput seen {result['max_throughput_rps']:,.0f} ok/s)")
+            else:
+                print(f"Saturation: {result['saturation_rps']:,.0f} rps "
+                      f"(max throughput seen {result['max_throughput_rps']:,.0f} ok/s)")
+            return result
+        if args.rate:
+            result = await open_loop(client, args.path, payloads, args.rate, args.duration,
+                                     max_outstanding=args.max_outstanding, poisson=args.poisson, **common)
+            print(_format(f"{args.rate:,.0f} rps", result))
+        else:
+            result = await closed_loop(client, args.path, payloads, args.concurrency, args.duration, **common)
+            print(_format(f"concurrency {args.concurrency}", result))
+        if args.batch_size > 1:
+            result['rows_per_s'] = result['throughput_rps'] * args.batch_size
+            print(f"  {result['rows_per_s']:,.0f} rows/s in batches of {args.batch_size}")
+        print("  latency histogram: " + ", ".join(f"{k} {v}" for k, v in result['histogram'].items()))
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the scoring API: fixed rate, fixed concurrency, or saturation search")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="API to test (ignored with --start-server)")
+    parser.add_argument('--start-server', action='store_true', help="Run uvicorn locally for the duration of the test")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--server-workers', type=int, default=1)
+    parser.add_argument('--path', default=None, help="Endpoint (default /predict, or /predict/batch with --batch-size)")
+    parser.add_argument('--batch-size', type=int, default=1, help="Payloads per request; >1 posts lists to /predict/batch")
+    parser.add_argument('--payloads', default=None, help="JSON list or JSONL of recorded TransactionRequest bodies")
+    parser.add_argument('--distinct', type=int, default=10_000,
+                        help="Synthetic payloads to cycle through; small values mostly hit the score cache")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rate', type=float, default=None, help="Open-loop arrival rate (requests/s)")
+    parser.add_argument('--poisson', action='store_true', help="Exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument('--concurrency', type=int, default=16, help="Closed-loop workers when no --rate is given")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per run (per step when searching)")
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--max-outstanding', type=int, default=1000, help="Open-loop cap; requests beyond it count as dropped")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--find-saturation', action='store_true')
+    parser.add_argument('--start-rate', type=float, default=50.0)
+    parser.add_argument('--growth', type=float, default=1.5)
+    parser.add_argument('--refine', type=int, default=3, help="Bisection steps after the first failing rate")
+    parser.add_argument('--slo-ms', type=float, default=100.0, help="p99 latency a passing step must stay under")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--output', default='bench_results/load_test.json')
+    args = parser.parse_args()
+
+    args.path = args.path or ('/predict/batch' if args.batch_size > 1 else '/predict')
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(args.distinct, args.seed)
+    print(f"{len(payloads):,} distinct payloads -> {args.path}")
+
+    server = None
+    url = args.url
+    if args.start_server:
+        print(f"Starting uvicorn with {args.server_workers} worker(s) on port {args.port}...")
+        server, url = start_server(args.port, args.server_workers)
+    try:
+        result = asyncio.run(run(args, payloads, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result['config'] = {k: v for k, v in vars(args).items() if k != 'output'}
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
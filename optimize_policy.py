@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.policy import optimize_policy, to_settings, loan_value
+from src.inference import reject_mask
+
+# Picks the EMV-maximizing threshold / min_fico / max_dti on out-of-sample
+# scores, saves them next to the model (the API loads them at startup) and
+# optionally pushes them to a running API's /settings.
+
+def scored_test_book(model_path):
+    from src.data_utils import load_training_split, find_features_file
+    from src.model import RiskModel
+    from src.features import align_features
+
+    data_path = find_features_file('bnpl_risk_platform')
+    print(f"Loading {data_path}...")
+    # Same split as run_benchmark.py, so these rows were not trained on
+    _, X_test, _, y_test = load_training_split(data_path)
+
+    print(f"Scoring {len(X_test)} held-out rows with {model_path}...")
+    model = RiskModel(model_path, native=True)
+    # The store may lack one-hot columns the model was trained with; those are 0
+    probs = model.predict_proba(align_features(X_test, model.feature_names))
+    return {
+        'prob': probs, 'amount': X_test['loan_amnt'].to_numpy(dtype=float),
+        'fico': X_test['fico_range_low'].to_numpy(dtype=float), 'dti': X_test['dti'].to_numpy(dtype=float),
+        'is_default': y_test.to_numpy(dtype=float),
+    }
+
+def synthetic_book(n, seed=42):
+    rng = np.random.default_rng(seed)
+    prob = rng.beta(1.5, 8, n)
+    return {
+        'prob': prob, 'amount': rng.integers(500, 40000, n).astype(float),
+        'fico': rng.integers(580, 850, n).astype(float), 'dti': rng.uniform(0, 50, n),
+        'is_default': (rng.random(n) < prob).astype(float),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="EMV-optimal approval settings")
+    parser.add_argument('--model', default='bnpl_risk_platform/models/champion_model.pkl')
+    parser.add_argument('--synthetic', type=int, default=None, help="Optimize a synthetic book of N rows instead")
+    parser.add_argument('--expected', action='store_true',
+                        help="Value loans at the model's probabilities instead of the realized outcomes")
+    parser.add_argument('--output', default='bnpl_risk_platform/models/policy_settings.json')
+    parser.add_argument('--publish', default=None, help="API base URL to POST the settings to, e.g. http://127.0.0.1:8000")
+    args = parser.parse_args()
+
+    book = synthetic_book(args.synthetic) if args.synthetic else scored_test_book(args.model)
+
+    start = time.perf_counter()
+    result = optimize_policy(book['prob'], book['amount'], fico=book['fico'], dti=book['dti'],
+                             is_default=None if args.expected else book['is_default'])
+    elapsed = time.perf_counter() - start
+    settings = to_settings(result)
+    print(f"Searched {len(result['grid'])} rule pairs x every threshold on {len(book['prob'])} rows in {elapsed:.2f}s")
+
+    print("\n--- TOP RULE PAIRS ---\n")
+    for r in result['grid'][:5]:
+        print(f"min_fico {r['min_fico']:>3}  max_dti {r['max_dti']:>3}  threshold {r['threshold']:.4f}  "
+              f"EMV {r['emv']:>14,.0f}  approval {r['approval_rate']:.1%}")
+
+    # Current hand-set defaults, valued the same way, for comparison
+    values = loan_value(book['prob'], book['amount'], None if args.expected else book['is_default'])
+    for name, s in [('default', {'threshold': 0.15, 'min_fico': 600, 'max_dti': 40}), ('optimized', settings)]:
+        approved = ~reject_mask(book['prob'], fico_score=book['fico'], dti=book['dti'], **s)
+        print(f"{name:>10} settings {s}: EMV {values[approved].sum():,.0f}, approval {approved.mean():.1%}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(settings, f, indent=2)
+    print(f"Saved to {args.output}")
+
+    if args.publish:
+        import requests
+        r = requests.post(args.publish.rstrip('/') + '/settings', json=settings, timeout=10)
+        r.raise_for_status()
+        print(f"Published to {args.publish}: {r.json()}")
+
+if __name__ == "__main__":
+    main()
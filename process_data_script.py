@@ -1,25 +1,94 @@
 import sys
 import os
-import pandas as pd
+import argparse
 
 # Fix path to include src
 sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
 # Also need to make sure we can import from src when running from root
 sys.path.append(os.path.abspath('bnpl_risk_platform'))
 
-from src.data_utils import load_data
-from src.features import create_features
+from src.data_utils import load_data, save_features, FeatureStoreWriter
+from src.features import (
+    create_features, build_feature_schema, scan_feature_schema, stream_features,
+    save_feature_schema, load_feature_schema, RAW_COLUMNS, NUM_COLS
+)
 
-raw_path = 'bnpl_risk_platform/data/raw/LendingClub_data.csv'
-print(f"Loading {raw_path}...")
-df_raw = load_data(raw_path)
-print(f"Raw shape: {df_raw.shape}")
-
-print("Creating features...")
-df_clean = create_features(df_raw)
-print(f"Processed shape: {df_clean.shape}")
+parser = argparse.ArgumentParser(description="Build the processed feature store from the raw LendingClub dump")
+parser.add_argument('--raw', default='bnpl_risk_platform/data/raw/LendingClub_data.csv')
+parser.add_argument('--stream', action='store_true',
+                    help="Read only the needed columns in chunks and append to the Parquet store")
+parser.add_argument('--chunksize', type=int, default=200000)
+parser.add_argument('--schema', default=None,
+                    help="Reuse medians/vocabularies from a feature_schema.json (or a model sidecar that has them) "
+                         "instead of building them from this file")
+parser.add_argument('--output', default=None,
+                    help="Write the features only to this file (.parquet/.feather/.csv) instead of the training store")
+parser.add_argument('--schema-out', default=None,
+                    help="Where to save the feature schema (default: the training one, unless --schema or --output is given)")
+args = parser.parse_args()
 
+raw_path = args.raw
 output_path = 'bnpl_risk_platform/data/processed/real_bnpl_features.csv'
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-df_clean.to_csv(output_path, index=False)
-print(f"Saved to {output_path}")
+store_path = args.output or 'bnpl_risk_platform/data/processed/real_bnpl_features.parquet'
+# A file featurized elsewhere (e.g. new outcomes for refresh_model.py) leaves the training schema alone
+schema_path = args.schema_out
+if schema_path is None and not (args.schema or args.output):
+    schema_path = 'bnpl_risk_platform/data/processed/feature_schema.json'
+
+# Checked before any data is read, so a schema without medians/vocabularies fails fast
+schema = None
+if args.schema:
+    print(f"Using feature schema from {args.schema}")
+    schema = load_feature_schema(args.schema)
+    no_median = [c for c in NUM_COLS if c not in schema['medians']]
+    if no_median:
+        print(f"  no training medians for {', '.join(no_median)}; their NAs get this file's own median")
+
+if args.stream:
+    # One chunk of the needed columns at a time; the schema pass adds a bounded
+    # per-column sample for the medians (see scan_feature_schema)
+    def raw_chunks():
+        return load_data(raw_path, columns=lambda c: c in RAW_COLUMNS, chunksize=args.chunksize)
+
+    if schema is None:
+        print(f"Scanning {raw_path} for medians and categories...")
+        schema = scan_feature_schema(raw_chunks())
+
+    print(f"Streaming features in chunks of {args.chunksize}...")
+    with FeatureStoreWriter(store_path) as writer:
+        for chunk in stream_features(raw_chunks(), schema):
+            writer.write(chunk)
+            print(f"  {writer.rows} rows written", end="\r")
+    print(f"\nSaved to {store_path}")
+
+else:
+    print(f"Loading {raw_path}...")
+    df_raw = load_data(raw_path)
+    print(f"Raw shape: {df_raw.shape}")
+
+    if schema is None:
+        print("Building feature schema...")
+        schema = build_feature_schema(df_raw)
+
+    print("Creating features...")
+    df_clean = create_features(df_raw, schema=schema)
+    print(f"Processed shape: {df_clean.shape}")
+
+    if args.output:
+        save_features(df_clean, store_path)
+        print(f"Saved to {store_path}")
+    else:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df_clean.to_csv(output_path, index=False)
+        print(f"Saved to {output_path}")
+
+        # Columnar copy with compact dtypes; readers can project just the columns they need
+        try:
+            save_features(df_clean, store_path)
+            print(f"Saved to {store_path}")
+        except ImportError as e:
+            print(f"Skipping columnar store (install pyarrow): {e}")
+
+if schema_path:
+    save_feature_schema({'medians': schema['medians'], 'categories': schema['categories']}, schema_path)
+    print(f"Feature schema saved to {schema_path}")
@@ -0,0 +1,105 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.data_utils import load_data, load_training_split, memory_report
+from src.model import RiskModel
+
+# Incremental refresh: continue boosting the champion on a file of new loan
+# outcomes instead of retraining on the full history. Featurize the raw file
+# with the champion's sidecar, into its own file so the training store and
+# feature_schema.json are left alone:
+#   process_data_script.py --raw new.csv --output new_features.parquet \
+#       --schema bnpl_risk_platform/models/champion_model.schema.json
+# The refreshed model only replaces the champion if its holdout AUC has not
+# dropped by more than --tolerance.
+
+TARGET = 'is_default'
+COMPILE_TOLERANCE = 1e-6
+
+def auc(model, X, y):
+    from sklearn.metrics import roc_auc_score
+    return roc_auc_score(y, model.predict_proba(X))
+
+def load_holdout(path, names):
+    # A fixed reference set, scored whole; its size does not grow with the history
+    df = load_data(path, columns=names + [TARGET])
+    return df[names].astype(np.float32), df[TARGET]
+
+def compiled_parity(model, X):
+    # Same check as compile_model.py, so the .npz/.trees the API serves match the pickle
+    try:
+        compiled = model.compile()
+    except ValueError:
+        return None
+    X = X[model.feature_names].iloc[:5000]
+    return float(np.abs(compiled.predict_proba(X.to_numpy(dtype=np.float32))[:, 1] - model.predict_proba(X)).max())
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start the champion on new outcomes, guarded by holdout AUC")
+    parser.add_argument('--model', default='bnpl_risk_platform/models/champion_model.pkl')
+    parser.add_argument('--new-data', required=True, help="Processed features of the new outcomes (Parquet/Feather/CSV)")
+    parser.add_argument('--trees', type=int, default=20, help="Trees to add")
+    parser.add_argument('--test-size', type=float, default=0.2, help="Share of the new data held out for the guardrail")
+    parser.add_argument('--holdout', nargs='*', default=[], help="Extra processed feature files to guard on, scored whole")
+    parser.add_argument('--tolerance', type=float, default=0.002, help="Largest AUC drop allowed on any holdout")
+    parser.add_argument('--output', default=None, help="Where to save an accepted model (default: --model)")
+    parser.add_argument('--dry-run', action='store_true', help="Evaluate only, never save")
+    args = parser.parse_args()
+
+    champion = RiskModel(args.model)
+    if champion.model is None:
+        sys.exit(f"No model at {args.model}")
+    names = champion.feature_names
+
+    print(f"Loading {args.new_data}...")
+    X_train, X_test, y_train, y_test = load_training_split(args.new_data, test_size=args.test_size)
+    report = memory_report(X_train, X_test, y_train, y_test)
+    print(f"New outcomes: {report['rows']:,} rows ({len(X_train):,} to train on, {len(X_test):,} held out)")
+
+    holdouts = {'new data': (X_test[names], y_test)}
+    for path in args.holdout:
+        holdouts[os.path.basename(path)] = load_holdout(path, names)
+
+    print(f"Adding {args.trees} trees to the {champion.model_type} champion...")
+    candidate = RiskModel(args.model)
+    start = time.perf_counter()
+    candidate.update(X_train, y_train, n_estimators=args.trees, X_val=X_test, y_val=y_test)
+    print(f"  fitted in {time.perf_counter() - start:.1f}s")
+
+    accepted = True
+    print("\n--- GUARDRAIL (AUC) ---")
+    for name, (X, y) in holdouts.items():
+        before, after = auc(champion, X, y), auc(candidate, X, y)
+        ok = after >= before - args.tolerance
+        accepted &= ok
+        print(f"{name:>24}: {before:.4f} -> {after:.4f} ({after - before:+.4f}) {'OK' if ok else 'FAIL'}")
+
+    diff = compiled_parity(candidate, X_test)
+    if diff is not None:
+        print(f"Compiled max abs diff vs refreshed model: {diff:.2e}")
+        accepted &= diff <= COMPILE_TOLERANCE
+
+    if not accepted:
+        print("\nRefresh rejected; the champion is unchanged.")
+        sys.exit(1)
+    if args.dry_run:
+        print("\nRefresh passed (dry run, not saved).")
+        return
+
+    # Pickle first, then the compiled artifacts the API prefers, as run_benchmark.py does
+    output = args.output or args.model
+    base_path = os.path.splitext(output)[0]
+    candidate.save(output)
+    if diff is not None:
+        candidate.save(base_path + '.npz')
+        candidate.save(base_path + '.trees')
+    print("\nRefreshed champion saved.")
+
+if __name__ == "__main__":
+    main()
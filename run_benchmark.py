@@ -1,60 +1,128 @@
 import sys
 import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 
 sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
 sys.path.append(os.path.abspath('bnpl_risk_platform'))
 
-from src.data_utils import load_data, split_data
-from src.model import RiskModel
+from src.data_utils import load_training_split, memory_report, rss_mb, find_features_file, share_frames, map_frames
+from src.model import RiskModel, DEFAULT_PARAMS
+from src.features import load_feature_schema
+from src.tuning import load_best_params
 
-data_path = 'bnpl_risk_platform/data/processed/real_bnpl_features.csv'
-print(f"Loading {data_path}...")
-df = load_data(data_path)
+MODELS_TO_TEST = ['logreg', 'rf', 'xgboost', 'catboost', 'lightgbm']
 
-target = 'is_default'
-X = df.drop(columns=[target])
-y = df[target]
+# Set per worker process by the pool initializer: the split memory-mapped from
+# files written once (data_utils.share_frames), so workers share its pages
+_data = {}
 
-X[target] = y
-X_train_full, X_test_full = split_data(X, target)
+def _init_worker(spec, feature_schema):
+    _data.update(map_frames(spec), feature_schema=feature_schema)
 
-y_train = X_train_full[target]
-X_train = X_train_full.drop(columns=[target])
-y_test = X_test_full[target]
-X_test = X_test_full.drop(columns=[target])
+def train_candidate(m_type, n_threads, params=None):
+    """Train and evaluate one model inside a worker, with its thread count capped."""
+    from threadpoolctl import threadpool_limits
 
-models_to_test = ['logreg', 'rf', 'xgboost', 'catboost', 'lightgbm']
-results = []
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
 
-print(f"Starting benchmark on {X_train.shape} samples...")
+    tuned = params is not None
+    if m_type == 'catboost':
+        # Otherwise CatBoost logs each run to catboost_info/ in the working directory
+        params = dict(DEFAULT_PARAMS[m_type] if params is None else params, allow_writing_files=False)
 
-for m_type in models_to_test:
-    print(f"\nTraining {m_type}...")
-    model = RiskModel(model_type=m_type)
+    # Caps BLAS/OpenMP pools the estimator's own n_jobs does not reach (e.g. lbfgs)
+    with threadpool_limits(limits=n_threads):
+        model = RiskModel(model_type=m_type, n_threads=n_threads)
+        model.train(_data['X_train'], _data['y_train'], X_val=_data['X_test'], y_val=_data['y_test'],
+                    params=params, feature_schema=_data['feature_schema'])
+        metrics = model.evaluate(_data['X_test'], _data['y_test'])
+
+    metrics.update({
+        'model': m_type,
+        'tuned': tuned,
+        'wall_time_s': time.perf_counter() - wall_start,
+        'cpu_time_s': time.process_time() - cpu_start,
+        'peak_rss_mb': rss_mb(peak=True),
+    })
+    return metrics, model
+
+def main():
+    parser = argparse.ArgumentParser(description="Train all candidate models in parallel and save the champion")
+    parser.add_argument('--workers', type=int, default=len(MODELS_TO_TEST))
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Threads per model (default: CPU count split across workers)")
+    parser.add_argument('--tuning', default='bnpl_risk_platform/models/tuning_results.json',
+                        help="Best params from tune_models.py, used when the file exists")
+    args = parser.parse_args()
+
+    # Columnar store if process_data_script.py wrote one, else the CSV.
+    # float32 numerics and uint8 one-hots, rows ordered [train | test]; the four inputs are views of them
+    data_path = find_features_file('bnpl_risk_platform')
+    print(f"Loading {data_path}...")
+    X_train, X_test, y_train, y_test = load_training_split(data_path)
+    report = memory_report(X_train, X_test, y_train, y_test)
+    print(f"Training data: {report['rows']:,} rows x {report['features']} {'/'.join(report['dtypes'])} features, "
+          f"{report['feature_mb'] + report['target_mb']:.1f}MB (process RSS {rss_mb():.0f}MB)")
+
+    # Medians and vocabularies from process_data_script.py, persisted with the model
+    schema_path = 'bnpl_risk_platform/data/processed/feature_schema.json'
+    feature_schema = load_feature_schema(schema_path) if os.path.exists(schema_path) else None
+
+    # Tuned tree counts already reflect early stopping on tune_models.py's
+    # validation rows, so the test split here is never used to pick them
+    tuned = load_best_params(args.tuning) if os.path.exists(args.tuning) else {}
+    if tuned:
+        print(f"Using tuned params from {args.tuning} for: {', '.join(sorted(tuned))}")
+
+    workers = max(1, min(args.workers, len(MODELS_TO_TEST)))
+    n_threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    results, trained = [], {}
+
+    print(f"Starting benchmark on {X_train.shape} samples: {workers} workers x {n_threads} threads...")
+
+    # One fresh process per model so peak RSS is attributable to that model. Fresh
+    # processes are spawned, not forked, so the split is passed as files to map
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(
+        max_workers=workers, max_tasks_per_child=1, initializer=_init_worker,
+        initargs=(share_frames(tmp, X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test), feature_schema)
+    ) as pool:
+        futures = {pool.submit(train_candidate, m_type, n_threads, tuned.get(m_type)): m_type for m_type in MODELS_TO_TEST}
+        for future in as_completed(futures):
+            m_type = futures[future]
+            try:
+                metrics, model = future.result()
+                results.append(metrics)
+                trained[m_type] = model
+                print(f"  {m_type}: AUC {metrics['auc']:.4f} in {metrics['wall_time_s']:.1f}s")
+            except Exception as e:
+                print(f"  {m_type} failed: {e}")
+
+    results_df = pd.DataFrame(results).sort_values('auc', ascending=False)
+    print("\n--- LEADERBOARD ---\n")
+    print(results_df.to_string(index=False))
+    results_df.to_csv('bnpl_risk_platform/models/leaderboard.csv', index=False)
+
+    champion = results_df.iloc[0]['model']
+    print(f"\nChampion: {champion}")
+
+    # The champion was already fitted in its worker; save that instance instead of retraining
+    final_model = trained[champion]
+    final_model.n_threads = None
+    final_model.save('bnpl_risk_platform/models/lightgbm_model.pkl') # Keep filename for compatibility
+    final_model.save('bnpl_risk_platform/models/champion_model.pkl')
+    print("Champion model saved.")
+
+    # NumPy-only artifact for the API; only tree ensembles can be compiled
     try:
-        model.train(X_train, y_train, X_val=X_test, y_val=y_test)
-        metrics = model.evaluate(X_test, y_test)
-        metrics['model'] = m_type
-        results.append(metrics)
-        print(f"  AUC: {metrics['auc']:.4f}")
-    except Exception as e:
-        print(f"  Failed: {e}")
-
-results_df = pd.DataFrame(results).sort_values('auc', ascending=False)
-print("\n--- LEADERBOARD ---\n")
-print(results_df)
-
-champion = results_df.iloc[0]['model']
-print(f"\nChampion: {champion}")
-
-# Save champion to be used by App (renaming to match what App expects if needed, or update App)
-# App currently looks for 'models/lightgbm_model.pkl'. 
-# We should probably update App to look for 'bnpl_risk_platform/models/risk_model_prod.pkl' or similar.
-# For now, let's overwrite the default one if the champion is strictly better, or save as prod.
-
-final_model = RiskModel(model_type=champion)
-final_model.train(X_train, y_train, X_val=X_test, y_val=y_test)
-final_model.save('bnpl_risk_platform/models/lightgbm_model.pkl') # Keep filename for compatibility
-final_model.save('bnpl_risk_platform/models/champion_model.pkl')
-print("Champion model saved.")
+        final_model.save('bnpl_risk_platform/models/champion_model.npz')
+        final_model.save('bnpl_risk_platform/models/champion_model.trees')
+    except ValueError as e:
+        print(f"Skipping compiled export: {e}")
+
+if __name__ == "__main__":
+    main()
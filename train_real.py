@@ -1,35 +1,30 @@
 import sys
 import os
-import pandas as pd
 
 sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
 sys.path.append(os.path.abspath('bnpl_risk_platform'))
 
-from src.data_utils import load_data, split_data
+from src.data_utils import load_training_split, memory_report, rss_mb, find_features_file
 from src.model import RiskModel
+from src.features import load_feature_schema
 
-data_path = 'bnpl_risk_platform/data/processed/real_bnpl_features.csv'
+# Columnar store if process_data_script.py wrote one, else the CSV
+data_path = find_features_file('bnpl_risk_platform')
 print(f"Loading {data_path}...")
-df = load_data(data_path)
+X_train, X_test, y_train, y_test = load_training_split(data_path)
+report = memory_report(X_train, X_test, y_train, y_test)
+print(f"Training data: {report['rows']:,} rows x {report['features']} {'/'.join(report['dtypes'])} features, "
+      f"{report['feature_mb'] + report['target_mb']:.1f}MB (process RSS {rss_mb():.0f}MB)")
 
-target = 'is_default'
-X = df.drop(columns=[target])
-y = df[target]
-
-print(f"Target distribution:\n{y.value_counts(normalize=True)}")
-
-X[target] = y
-X_train_full, X_test_full = split_data(X, target)
-
-y_train = X_train_full[target]
-X_train = X_train_full.drop(columns=[target])
-y_test = X_test_full[target]
-X_test = X_test_full.drop(columns=[target])
+# Medians and vocabularies from process_data_script.py, persisted with the model
+schema_path = 'bnpl_risk_platform/data/processed/feature_schema.json'
+feature_schema = load_feature_schema(schema_path) if os.path.exists(schema_path) else None
 
+print(f"Target distribution (train):\n{y_train.value_counts(normalize=True)}")
 print(f'Train shape: {X_train.shape}, Test shape: {X_test.shape}')
 
 model = RiskModel()
-model.train(X_train, y_train, X_val=X_test, y_val=y_test)
+model.train(X_train, y_train, X_val=X_test, y_val=y_test, feature_schema=feature_schema)
 metrics = model.evaluate(X_test, y_test)
 print(f"Model AUC: {metrics['auc']:.4f}")
 
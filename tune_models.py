@@ -0,0 +1,55 @@
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.abspath('bnpl_risk_platform/src'))
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.data_utils import load_training_split, rss_mb, find_features_file
+from src.tuning import SEARCH_SPACES, successive_halving, save_results
+
+# Successive-halving search over each model type's grid (see src.tuning). Only
+# the training split is used, the last part of it for validation, so the test
+# split run_benchmark.py ranks models on stays unseen. run_benchmark.py trains
+# with the best params saved here.
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune each model type with successive halving")
+    parser.add_argument('--models', nargs='+', default=list(SEARCH_SPACES), choices=list(SEARCH_SPACES))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Trials run in parallel")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Threads per trial (default: CPU count split across workers)")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta of each rung, at eta times the budget")
+    parser.add_argument('--early-stopping-rounds', type=int, default=20)
+    parser.add_argument('--val-size', type=float, default=0.2, help="Share of the training split used for validation")
+    parser.add_argument('--max-configs', type=int, default=None, help="Sample this many configs per grid")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bnpl_risk_platform/models/tuning_results.json')
+    args = parser.parse_args()
+
+    data_path = find_features_file('bnpl_risk_platform')
+    print(f"Loading {data_path}...")
+    X_train, _, y_train, _ = load_training_split(data_path)
+    print(f"Training split: {len(X_train):,} rows x {X_train.shape[1]} features (process RSS {rss_mb():.0f}MB)")
+
+    print(f"Successive halving (eta={args.eta}) over {', '.join(args.models)}...")
+    results = successive_halving(
+        X_train, y_train, model_types=args.models, val_size=args.val_size, eta=args.eta,
+        early_stopping_rounds=args.early_stopping_rounds, workers=args.workers, n_threads=args.threads,
+        max_configs=args.max_configs, seed=args.seed,
+    )
+
+    print("\n--- BEST CONFIGS (validation AUC) ---\n")
+    for m_type, r in sorted(results['models'].items(), key=lambda kv: -kv[1].get('best_auc', -1)):
+        if 'error' in r:
+            print(f"{m_type:>10}: failed ({r['error']})")
+            continue
+        print(f"{m_type:>10}: {r['best_auc']:.4f} after {len(r['trials'])} trials, "
+              f"{r['wall_time_s']:.1f}s wall / {r['cpu_time_s']:.1f}s CPU  {r['best_params']}")
+    print(f"\nTotal {results['wall_time_s']:.1f}s on {results['workers']} workers x {results['threads_per_trial']} threads")
+
+    save_results(results, args.output)
+    print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.model import RiskModel
+from src.serving import load_model
+from src.encoder import DEFAULT_FEATURE_NAMES, NUMERIC_FEATURES, CATEGORIES
+
+MODEL_TYPES = ['logreg', 'rf', 'xgboost', 'catboost', 'lightgbm']
+TOLERANCE = 1e-6
+
+def make_data(n, seed=42):
+    # Random numeric columns plus one-hot blocks; values are float32 exact so
+    # wrapper and native paths see identical inputs. Built as one array first:
+    # .values on a DataFrame is a copy, so writing the one-hots through it is lost
+    rng = np.random.default_rng(seed)
+    values = np.zeros((n, len(DEFAULT_FEATURE_NAMES)), dtype=np.float32)
+    for col in NUMERIC_FEATURES:
+        values[:, DEFAULT_FEATURE_NAMES.index(col)] = rng.normal(0, 1, n)
+    for cat, cats in CATEGORIES.items():
+        cols = [DEFAULT_FEATURE_NAMES.index(f'{cat}_{v}') for v in cats]
+        values[np.arange(n), np.array(cols)[rng.integers(0, len(cols), n)]] = 1.0
+    X = pd.DataFrame(values, columns=DEFAULT_FEATURE_NAMES)
+    # Exactly one hot column per category on every row
+    assert (X.iloc[:, len(NUMERIC_FEATURES):].sum(axis=1) == len(CATEGORIES)).all()
+    # A categorical term in the target, so the models have to split on the one-hots
+    grade = X[[f'grade_{g}' for g in CATEGORIES['grade']]].to_numpy() @ np.linspace(-1, 1, len(CATEGORIES['grade']))
+    logit = X['int_rate'] - X['fico_range_low'] + 0.5 * X['dti'] + grade
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return X, pd.Series(y)
+
+def test_native_parity():
+    X, y = make_data(2000)
+    X_score = X.iloc[:500]
+    failed = False
+
+    for m_type in MODEL_TYPES:
+        model = RiskModel(model_type=m_type)
+        model.train(X, y)
+        wrapper = model.predict_proba(X_score)
+        wrapper_row = model.predict_proba(X_score.iloc[:1])
+
+        model.enable_native()
+        native = model.predict_proba(X_score.to_numpy(dtype=np.float32))
+        native_row = model.predict_proba(X_score.to_numpy(dtype=np.float32)[:1])
+
+        diff = max(np.abs(wrapper - native).max(), np.abs(wrapper_row - native_row).max())
+        status = "OK" if diff <= TOLERANCE else "MISMATCH"
+        failed |= diff > TOLERANCE
+        print(f"{m_type:>10}: max abs diff {diff:.2e} {status}")
+    return failed
+
+def test_routing():
+    # Small batches go to the compiled trees, larger ones to the booster, with the same scores;
+    # a compiled file left over from another champion is not served
+    X, y = make_data(2000)
+    X_np = X.to_numpy(dtype=np.float32)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'champion_model.pkl')
+        model = RiskModel(model_type='catboost')
+        model.train(X, y, params={'n_estimators': 50, 'verbose': 0, 'allow_writing_files': False})
+        for ext in ('.pkl', '.trees'):
+            model.save(path.replace('.pkl', ext))
+        routed = load_model(path, compiled_max_rows=32)
+        expected = model.predict_proba(X)
+        diff = max(np.abs(routed.predict_proba(X_np[:n]) - expected[:n]).max() for n in (1, 32, 33, len(X_np)))
+        ok = routed.compiled is not None and routed.booster is not None and diff <= TOLERANCE
+        failed |= not ok
+        print(f"   routing: max abs diff {diff:.2e} {'OK' if ok else 'MISMATCH'}")
+
+        stale = RiskModel(model_type='logreg')
+        stale.train(X, y)
+        stale.save(path)
+        routed = load_model(path, compiled_max_rows=32)
+        ok = routed.compiled is None and routed.model_type == 'logreg'
+        failed |= not ok
+        print(f"     stale: compiled {'ignored OK' if ok else 'SERVED'}")
+    return failed
+
+if __name__ == "__main__":
+    failed = test_native_parity()
+    failed |= test_routing()
+    if failed:
+        print("TEST FAILED")
+        sys.exit(1)
+    print("TEST PASSED")
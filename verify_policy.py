@@ -0,0 +1,118 @@
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.inference import (
+    make_decision, get_recommended_limit, calculate_expected_profit, LIMIT_BANDS,
+    make_decision_batch, get_recommended_limit_batch, calculate_expected_profit_batch, apply_policy_batch,
+    reject_mask
+)
+from src.policy import optimize_policy, loan_value, ScoredBook
+
+# The array policy functions must match the scalar ones row for row,
+# including probabilities exactly on a band edge and NaNs. The EMV optimizer
+# is checked against a brute-force search.
+
+def make_book(n, seed=42):
+    rng = np.random.default_rng(seed)
+    prob = rng.beta(1, 8, n)
+    prob[:len(LIMIT_BANDS)] = LIMIT_BANDS
+    prob[len(LIMIT_BANDS):2 * len(LIMIT_BANDS)] = np.nextafter(LIMIT_BANDS, 0)
+    prob[2 * len(LIMIT_BANDS)] = np.nan
+    return {
+        'prob': prob,
+        'amount': rng.integers(100, 40000, n).astype(float),
+        'fico': rng.integers(550, 850, n).astype(float),
+        'dti': rng.uniform(0, 50, n),
+    }
+
+def scalar_policy(book, threshold=0.15):
+    decisions, final, limits, profits = [], [], [], []
+    for p, a, f, d in zip(book['prob'], book['amount'], book['fico'], book['dti']):
+        decision = make_decision(p, a, threshold=threshold, fico_score=f, dti=d)
+        fp = 1.0 if decision == 'REJECT' and p <= threshold else p
+        decisions.append(decision)
+        final.append(fp)
+        limits.append(get_recommended_limit(fp) if decision == 'APPROVE' else 0)
+        profits.append(calculate_expected_profit(fp, a))
+    return np.array(decisions), np.array(final), np.array(limits), np.array(profits)
+
+def check_optimizer(n=3000, seed=7):
+    book = make_book(n, seed)
+    prob = np.round(np.nan_to_num(book['prob']), 3)  # ties on purpose
+    outcome = (np.random.default_rng(seed).random(n) < prob).astype(float)
+    fico_grid, dti_grid = (0, 650, 700), (30, 999)
+    result = optimize_policy(prob, book['amount'], fico=book['fico'], dti=book['dti'], is_default=outcome,
+                             min_fico_grid=fico_grid, max_dti_grid=dti_grid)
+
+    values = loan_value(prob, book['amount'], outcome)
+    best = 0.0
+    for threshold in np.unique(prob):
+        for min_fico in fico_grid:
+            for max_dti in dti_grid:
+                approved = ~reject_mask(prob, threshold, book['fico'], book['dti'], min_fico, max_dti)
+                best = max(best, values[approved].sum())
+    approved = ~reject_mask(prob, result['threshold'], book['fico'], book['dti'], result['min_fico'], result['max_dti'])
+    assert np.isclose(result['emv'], best) and np.isclose(values[approved].sum(), best)
+    assert approved.sum() == result['approved']
+    print(f"optimize_policy matches brute force: EMV {best:,.0f} at {result['threshold']}")
+
+def check_scored_book():
+    # A store without some of the model's one-hot columns scores as if they were 0
+    from src.model import RiskModel
+    from verify_native import make_data
+    X, y = make_data(3000)
+    model = RiskModel(model_type='lightgbm')
+    model.train(X, y)
+    dropped = ['home_ownership_NONE', 'purpose_wedding']
+    rows = X[(X[dropped] == 0).all(axis=1)]
+    book = ScoredBook.from_frame(rows.drop(columns=dropped).assign(is_default=y), model)
+    assert np.allclose(book.prob, model.predict_proba(rows))
+    try:
+        ScoredBook.from_frame(rows.drop(columns=['int_rate']), model)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a missing numeric feature was scored")
+    print(f"ScoredBook scores {len(book)} rows missing {len(dropped)} one-hot columns")
+
+def main():
+    book = make_book(200_000)
+    p = book['prob']
+
+    assert np.array_equal(get_recommended_limit_batch(p), [get_recommended_limit(x) for x in p])
+    assert np.array_equal(get_recommended_limit_batch(p, max_limit=8000), [get_recommended_limit(x, max_limit=8000) for x in p])
+    assert np.array_equal(
+        make_decision_batch(p, book['amount'], fico_score=book['fico'], dti=book['dti']),
+        [make_decision(x, a, fico_score=f, dti=d) for x, a, f, d in zip(p, book['amount'], book['fico'], book['dti'])]
+    )
+    assert np.array_equal(
+        calculate_expected_profit_batch(p, book['amount'], lgd=0.6),
+        [calculate_expected_profit(x, a, lgd=0.6) for x, a in zip(p, book['amount'])], equal_nan=True
+    )
+
+    start = time.perf_counter()
+    decisions, final, limits, profits = scalar_policy(book)
+    t_scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    policy = apply_policy_batch(p, book['amount'], fico_score=book['fico'], dti=book['dti'])
+    t_batch = time.perf_counter() - start
+
+    assert np.array_equal(np.where(policy['approved'], 'APPROVE', 'REJECT'), decisions)
+    assert np.array_equal(policy['probability_of_default'], final, equal_nan=True)
+    assert np.array_equal(policy['recommended_limit'], limits)
+    assert np.array_equal(policy['expected_profit'], profits, equal_nan=True)
+
+    n = len(p)
+    print(f"Scalar and batch policies agree on {n} rows")
+    print(f"Scalar loop: {t_scalar:.3f}s, batch: {t_batch * 1e3:.1f}ms ({t_scalar / t_batch:.0f}x)")
+
+    check_optimizer()
+    check_scored_book()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+import os
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.model import RiskModel
+from verify_native import make_data
+
+WARM_START_TYPES = ['lightgbm', 'xgboost', 'catboost']
+TOLERANCE = 1e-6
+
+def test_warm_start():
+    X, y = make_data(6000)
+    X_old, y_old = X.iloc[:4000], y.iloc[:4000]
+    X_new, y_new = X.iloc[4000:], y.iloc[4000:]
+    failed = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for m_type in WARM_START_TYPES:
+            path = os.path.join(tmp, f'{m_type}.pkl')
+            model = RiskModel(model_type=m_type)
+            model.train(X_old, y_old)
+            model.save(path)
+            before = model.predict_proba(X_new)
+
+            # Refresh from the saved artifact, as refresh_model.py does
+            refreshed = RiskModel(path)
+            refreshed.update(X_new, y_new, n_estimators=10)
+            compiled = refreshed.compile()
+            diff = np.abs(compiled.predict_proba(X_new.to_numpy(dtype=np.float32))[:, 1]
+                          - refreshed.predict_proba(X_new)).max()
+            changed = np.abs(refreshed.predict_proba(X_new) - before).max()
+
+            # With a validation set, as refresh_model.py passes its guardrail holdout, the
+            # refresh must still add every tree rather than stop at the holdout's best
+            guarded = RiskModel(path)
+            guarded.update(X_new.iloc[:1000], y_new.iloc[:1000], n_estimators=10,
+                           X_val=X_new.iloc[1000:], y_val=y_new.iloc[1000:])
+
+            ok = compiled.n_trees == 110 and guarded.trees_used == 110 and diff <= TOLERANCE and changed > 0
+            failed |= not ok
+            print(f"{m_type:>10}: {compiled.n_trees} trees ({guarded.trees_used} with X_val), compiled diff {diff:.2e}, "
+                  f"max change {changed:.3f} {'OK' if ok else 'MISMATCH'}")
+
+        # Estimators without an init-model path, and compiled artifacts, refuse to update
+        for m_type in ['rf', 'logreg']:
+            model = RiskModel(model_type=m_type)
+            model.train(X_old, y_old)
+            failed |= not _raises(lambda: model.update(X_new, y_new))
+        model = RiskModel(model_type='lightgbm')
+        model.train(X_old, y_old)
+        model.save(os.path.join(tmp, 'lightgbm.trees'))
+        failed |= not _raises(lambda: RiskModel(os.path.join(tmp, 'lightgbm.trees')).update(X_new, y_new))
+
+    if failed:
+        print("TEST FAILED")
+        sys.exit(1)
+    print("TEST PASSED")
+
+def _raises(func):
+    try:
+        func()
+    except ValueError as e:
+        print(f"  refused: {e}")
+        return True
+    print("  expected a ValueError")
+    return False
+
+if __name__ == "__main__":
+    test_warm_start()
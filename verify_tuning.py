@@ -0,0 +1,73 @@
+import sys
+import os
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath('bnpl_risk_platform'))
+
+from src.model import RiskModel, DEFAULT_PARAMS
+from src.tuning import SEARCH_SPACES, grid_configs, successive_halving, save_results, load_best_params
+from verify_native import make_data
+
+BOOSTERS = ['lightgbm', 'xgboost', 'catboost']
+TOLERANCE = 1e-6
+
+def test_early_stopping():
+    # A stopped booster predicts with its best iteration on every path: wrapper, native and compiled
+    X, y = make_data(6000)
+    X_fit, y_fit, X_val, y_val = X.iloc[:4000], y.iloc[:4000], X.iloc[4000:], y.iloc[4000:]
+    X_np = X_val.to_numpy(dtype=np.float32)
+    failed = False
+    for m_type in BOOSTERS:
+        model = RiskModel(model_type=m_type)
+        model.train(X_fit, y_fit, X_val, y_val, params=dict(DEFAULT_PARAMS[m_type], n_estimators=1000),
+                    early_stopping_rounds=10)
+        wrapper = model.predict_proba(X_val)
+        compiled = model.compile()
+        model.enable_native()
+        diff = max(np.abs(compiled.predict_proba(X_np)[:, 1] - wrapper).max(),
+                   np.abs(model.predict_proba(X_np) - wrapper).max())
+        ok = model.trees_used < 1000 and compiled.n_trees == model.trees_used and diff <= TOLERANCE
+        failed |= not ok
+        print(f"{m_type:>10}: stopped at {model.trees_used} trees, max diff {diff:.2e} {'OK' if ok else 'MISMATCH'}")
+    return failed
+
+def test_search():
+    X, y = make_data(5000, seed=7)
+    models = ['lightgbm', 'xgboost', 'logreg']
+    results = successive_halving(X, y, model_types=models, max_configs=6, workers=2, n_threads=1,
+                                 early_stopping_rounds=10, log=lambda msg: None)
+    failed = False
+    for m_type in models:
+        r = results['models'][m_type]
+        space = SEARCH_SPACES[m_type]
+        sizes = [rung['configs'] for rung in r['rungs']]
+        budgets = [rung['budget'] for rung in r['rungs']]
+        # Each rung keeps at most 1/eta of the last, on a larger budget, ending on the full one
+        ok = (sizes[0] == len(grid_configs(space['grid'], max_configs=6)) and sizes[-1] == 1
+              and all(b <= max(1, a // 3) for a, b in zip(sizes, sizes[1:]))
+              and budgets == sorted(budgets) and budgets[-1] == space['max_budget']
+              and len(r['trials']) == sum(sizes))
+        if space['resource'] == 'n_estimators':
+            ok &= r['best_params']['n_estimators'] <= space['max_budget']
+        failed |= not ok
+        print(f"{m_type:>10}: rungs {sizes} at {[round(b, 3) for b in budgets]}, "
+              f"best AUC {r['best_auc']:.4f} {'OK' if ok else 'BAD SCHEDULE'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tuning_results.json')
+        save_results(results, path)
+        params = load_best_params(path)
+    ok = sorted(params) == sorted(models) and all(
+        params[m][k] == v for m in models for k, v in results['models'][m]['best_params'].items())
+    failed |= not ok
+    print(f"best params round-trip {'OK' if ok else 'MISMATCH'}")
+    return failed
+
+if __name__ == "__main__":
+    failed = test_early_stopping()
+    failed |= test_search()
+    if failed:
+        print("TEST FAILED")
+        sys.exit(1)
+    print("TEST PASSED")